@@ -19,12 +19,15 @@ setup(
     py_modules=["srt", "srt_tools.utils"],
     scripts=[
         "srt_tools/srt",
+        "srt_tools/srt-at",
+        "srt_tools/srt-batch",
         "srt_tools/srt-deduplicate",
         "srt_tools/srt-normalise",
         "srt_tools/srt-fixed-timeshift",
         "srt_tools/srt-linear-timeshift",
         "srt_tools/srt-lines-matching",
         "srt_tools/srt-mux",
+        "srt_tools/srt-overlaps",
         "srt_tools/srt-play",
         "srt_tools/srt-process",
     ],
@@ -4,13 +4,23 @@
 """A tiny library for parsing, modifying, and composing SRT files."""
 
 from __future__ import unicode_literals
+from array import array
+import array as array_module
+import codecs
+import contextlib
 import functools
+import heapq
+import itertools
+import mmap
+import operator
+import os
 import re
+import struct
+import tempfile
 from datetime import timedelta
 import logging
 import io
 
-
 LOG = logging.getLogger(__name__)
 
 # "." is not technically valid as a delimiter, but many editors create SRT
@@ -45,6 +55,9 @@ RGX_CONTENT = r".*?"
 RGX_POSSIBLE_CRLF = r"\r?\n"
 
 TS_REGEX = re.compile(RGX_TIMESTAMP_PARSEABLE)
+# The form compose (and almost everything else) writes, which is cheaper to
+# match than TS_REGEX's optional delimiters. Anything else falls back to it.
+CANONICAL_TS_REGEX = re.compile(r"([0-9]{2}):([0-9]{2}):([0-9]{2}),([0-9]{3})\Z")
 MULTI_WS_REGEX = re.compile(r"\n\n+")
 SRT_REGEX = re.compile(
     r"\s*(?:({idx})\s*{eof})?({ts}) *-[ -] *> *({ts}) ?({proprietary})(?:{eof}|\Z)({content})"
@@ -74,28 +87,259 @@ SRT_REGEX = re.compile(
     re.DOTALL,
 )
 
+# A position where a stream of SRT data can be split without changing how
+# SRT_REGEX would match it as a whole: at the start of a line, before an index
+# line which is followed by a timestamp, as long as the line before it isn't
+# a timestamp line (see _block_boundaries). See parse_stream for why the index
+# is needed.
+BLOCK_BOUNDARY_REGEX = re.compile(
+    r"\n(?={idx}\s*{eof}{ts})".format(
+        idx=RGX_INDEX, ts=RGX_TIMESTAMP, eof=RGX_POSSIBLE_CRLF
+    )
+)
+# The arrow which every timestamp line SRT_REGEX matches has
+TIMESTAMP_ARROW_REGEX = re.compile(r"-[ -] *>")
+
+# Used by the "fast" parsing engine to check that blocks are in the strict,
+# common form that it can handle without SRT_REGEX. See _match_block_fast.
+FAST_HEADER_REGEX = re.compile(
+    r"([0-9]+)\n({ts}) --> ({ts})(?: ([^\r\n]*))?\n".format(
+        ts=r"[0-9]+:[0-9]+:[0-9]+,[0-9]+"
+    )
+)
+# Finds the blank line ending a block's content, unless something comes
+# before it that the fast engine bails out on anyway, which stops the search
+# at the next index line when blocks aren't separated by blank lines
+FAST_CONTENT_END_REGEX = re.compile(r"\n\n|\r|\n[-0-9]")
+FAST_NEXT_BLOCK_REGEX = re.compile(
+    r"(?:(?:{idx}\s*{eof})?{ts}|\Z)".format(
+        idx=RGX_INDEX, ts=RGX_TIMESTAMP, eof=RGX_POSSIBLE_CRLF
+    )
+)
+
+# The same for parse_bytes, which runs the "fast" engine on undecoded UTF-8 or
+# ASCII bytes. Here, \s and the timestamp delimiters only match ASCII, so
+# these accept a subset of what the patterns above do, which is fine, since
+# anything they don't accept just goes to the full parser.
+RGX_TIMESTAMP_ASCII = RGX_TIMESTAMP.replace(RGX_TIMESTAMP_MAGNITUDE_DELIM, "[,.:]")
+FAST_HEADER_BYTES_REGEX = re.compile(
+    r"([0-9]+)\n{ts} --> {ts}(?: ([^\r\n]*))?\n".format(
+        ts=r"([0-9]+):([0-9]+):([0-9]+),([0-9]+)"
+    ).encode("ascii")
+)
+FAST_CONTENT_END_BYTES_REGEX = re.compile(
+    FAST_CONTENT_END_REGEX.pattern.encode("ascii")
+)
+FAST_NEXT_BLOCK_BYTES_REGEX = re.compile(
+    r"(?:(?:{idx}\s*{eof})?{ts}|\Z)".format(
+        idx=RGX_INDEX, ts=RGX_TIMESTAMP_ASCII, eof=RGX_POSSIBLE_CRLF
+    ).encode("ascii")
+)
+BLOCK_BOUNDARY_BYTES_REGEX = re.compile(
+    r"\n(?={idx}\s*{eof}{ts})".format(
+        idx=RGX_INDEX, ts=RGX_TIMESTAMP_ASCII, eof=RGX_POSSIBLE_CRLF
+    ).encode("ascii")
+)
+TIMESTAMP_ARROW_BYTES_REGEX = re.compile(TIMESTAMP_ARROW_REGEX.pattern.encode("ascii"))
+
+MULTI_WS_BYTES_REGEX = re.compile(MULTI_WS_REGEX.pattern.encode("ascii"))
+
+# The encodings which parse_bytes can parse without decoding first, and the
+# codec to decode their fields with
+BYTES_ENGINE_CODECS = {"utf-8": "utf-8", "utf-8-sig": "utf-8", "ascii": "ascii"}
+
+PARSE_ENGINES = ("fast", "regex")
+
 ZERO_TIMEDELTA = timedelta(0)
 
+# Why subtitles are skipped when composing, and the rule for each, which is
+# True if a subtitle should be skipped, given whether its content is blank,
+# its start and end times, and zero in the same units as those times. Taking
+# these rather than a Subtitle means that the same rules work on
+# SubtitleTable rows, and that each field is only worked out once.
+_SKIP_RULES = (
+    ("No content", lambda blank, start, end, zero: blank),
+    ("Start time < 0 seconds", lambda blank, start, end, zero: start < zero),
+    ("Subtitle start time >= end time", lambda blank, start, end, zero: start >= end),
+)
+
 # Info message if truthy return -> Function taking a Subtitle, skip if True
-SUBTITLE_SKIP_CONDITIONS = (
-    ("No content", lambda sub: not sub.content.strip()),
-    ("Start time < 0 seconds", lambda sub: sub.start < ZERO_TIMEDELTA),
-    ("Subtitle start time >= end time", lambda sub: sub.start >= sub.end),
+SUBTITLE_SKIP_CONDITIONS = tuple(
+    (
+        info_msg,
+        lambda sub, rule=rule: rule(
+            not sub.content.strip(), sub.start, sub.end, ZERO_TIMEDELTA
+        ),
+    )
+    for info_msg, rule in _SKIP_RULES
 )
 
 SECONDS_IN_HOUR = 3600
 SECONDS_IN_MINUTE = 60
 HOURS_IN_DAY = 24
 MICROSECONDS_IN_MILLISECOND = 1000
+MILLISECONDS_IN_SECOND = 1000
+MILLISECONDS_IN_MINUTE = SECONDS_IN_MINUTE * MILLISECONDS_IN_SECOND
+MILLISECONDS_IN_HOUR = SECONDS_IN_HOUR * MILLISECONDS_IN_SECOND
+SECONDS_IN_DAY = HOURS_IN_DAY * SECONDS_IN_HOUR
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# When parse_stream looks for a block boundary in newly read data, how far
+# back into the data it already searched to start from, since a boundary only
+# matches once the index and timestamp after it have been read. This only
+# needs to cover an index line and a timestamp: if an unusually long one is
+# missed, the data is just split at a later boundary instead.
+BOUNDARY_SEARCH_OVERLAP = 64
+
+# When parsing in parallel, how much data each worker process should get at
+# least, since below that starting the workers costs more than it saves, and
+# how many chunks to split the data into per worker, so that workers which
+# finish early can pick up more work
+PARALLEL_MIN_CHUNK_SIZE = 1024 * 1024
+PARALLEL_CHUNKS_PER_JOB = 4
+
+# When sorting runs of subtitles in temporary files, how many to write and
+# read back at once. Merging holds one batch per run in memory.
+EXTERNAL_SORT_BATCH_SIZE = 1024
+
+# Each batch in those files is its length in bytes, followed by a record for
+# each subtitle in it: the number of its class, flags (see below), its start
+# and end times, each as days and microseconds (or as milliseconds and no
+# days), and the lengths of its index, content and proprietary metadata,
+# which follow as UTF-8. The index is stored as text, since it doesn't have
+# to fit in 64 bits.
+_RUN_BATCH = struct.Struct("<Q")
+_RUN_RECORD = struct.Struct("<HBiqiqIII")
+_RUN_NO_INDEX = 1
+_RUN_START_MS = 2
+_RUN_END_MS = 4
+
+# Content can have lone surrogates in it (from surrogateescape, say), which
+# Python 3's UTF-8 codec only encodes with "surrogatepass". That handler
+# doesn't exist in Python 2, whose UTF-8 codec encodes them anyway.
+_RUN_STRING_ERRORS = "surrogatepass" if bytes is not str else "strict"
+
+# Subtrees of a SubtitleIndex at or below this level (up to 15 subtitles) are
+# scanned in full when queried, since that's quicker than descending them
+INDEX_SCAN_LEVEL = 3
 
 try:
     FILE_TYPES = (file, io.IOBase)  # pytype: disable=name-error
 except NameError:  # `file` doesn't exist in Python 3
     FILE_TYPES = (io.IOBase,)
 
+# `lru_cache` doesn't exist in Python 2
+_lru_cache = getattr(functools, "lru_cache", None)
+
+# The array.array typecode for SubtitleTable's columns. "q" (and
+# `array.typecodes`) doesn't exist in Python 2, so fall back to "l" there,
+# which is 64 bits on most platforms other than Windows. It must be a native
+# str, since Python 2's array() doesn't take unicode.
+ARRAY_TYPECODE = str("q" if "q" in getattr(array_module, "typecodes", "") else "l")
+
+
+class BaseSubtitle(object):
+    """
+    What :py:class:`Subtitle` and :py:class:`MillisecondSubtitle` have in
+    common, which is everything but how they store their start and end times.
+    Check for this rather than :py:class:`Subtitle` to accept either.
+
+    :param index: The SRT index for this subtitle
+    :type index: int or None
+    :param str content: The subtitle content, see :py:class:`Subtitle`
+    :param str proprietary: Proprietary metadata for this subtitle
+    """
+
+    # We can have hundreds of thousands of these around at once, so don't give
+    # each one its own __dict__. Subclasses add slots for their times.
+    __slots__ = ("index", "content", "proprietary")
+
+    # The attributes making up this subtitle, in the same order as the
+    # arguments to __init__. Subclasses set this, and implement _astuple and
+    # _srt_timestamps.
+    _FIELDS = ()
+
+    def __init__(self, index, content, proprietary=""):
+        self.index = index
+        self.content = content
+        self.proprietary = proprietary
+
+    @property
+    def __dict__(self):
+        """
+        A new dict of this subtitle's fields, so that ``vars(subtitle)`` and
+        ``Subtitle(**vars(subtitle))`` still work now that we use __slots__.
+        Changing it does not change the subtitle.
+        """
+        return dict(zip(self._FIELDS, self._astuple()))
+
+    def copy(self):
+        """
+        :returns: A shallow copy of this subtitle, of the same class
+        """
+        return type(self)(*self._astuple())
+
+    def __reduce__(self):
+        return type(self), self._astuple()
+
+    def __hash__(self):
+        return hash(self._astuple())
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, BaseSubtitle)
+            and self._FIELDS == other._FIELDS
+            and self._astuple() == other._astuple()
+        )
+
+    def __repr__(self):
+        item_list = ", ".join(
+            "%s=%r" % (k, v) for k, v in zip(self._FIELDS, self._astuple())
+        )
+        return "%s(%s)" % (type(self).__name__, item_list)
+
+    def to_srt(self, strict=True, eol="\n"):
+        r"""
+        Convert the current :py:class:`Subtitle` to an SRT block.
+
+        :param bool strict: If disabled, will allow blank lines in the content
+                            of the SRT block, which is a violation of the SRT
+                            standard and may cause your media player to explode
+        :param str eol: The end of line string to use (default "\\n")
+        :returns: The metadata of the current :py:class:`Subtitle` object as an
+                  SRT formatted subtitle block
+        :rtype: str
+        """
+        return self._to_srt(self.index, strict, eol)
+
+    def _to_srt(self, index, strict, eol):
+        """
+        :py:meth:`to_srt`, but writing ``index`` rather than this subtitle's
+        own index, so that :py:func:`compose` can reindex without copying.
+        """
+        start, end = self._srt_timestamps()
+        return _format_srt_block(
+            index, start, end, self.content, self.proprietary, strict, eol
+        )
+
+    def _astuple(self):
+        """
+        :returns: The values of the fields in _FIELDS
+        :rtype: tuple
+        """
+        raise NotImplementedError
+
+    def _srt_timestamps(self):
+        """
+        :returns: The start and end times as SRT timestamps
+        :rtype: (str, str)
+        """
+        raise NotImplementedError
+
 
 @functools.total_ordering
-class Subtitle(object):
+class Subtitle(BaseSubtitle):
     r"""
     The metadata relating to a single subtitle. Subtitles are sorted by start
     time by default. If no index was provided, index 0 will be used on writing
@@ -114,7 +358,13 @@ class Subtitle(object):
                         Subtitle objects.
     """
 
-    # pylint: disable=R0913
+    __slots__ = ("start", "end")
+
+    _FIELDS = ("index", "start", "end", "content", "proprietary")
+
+    # Setting every field here, rather than calling BaseSubtitle.__init__,
+    # saves a call for each subtitle we parse
+    # pylint: disable=R0913,W0231
     def __init__(self, index, start, end, content, proprietary=""):
         self.index = index
         self.start = start
@@ -122,11 +372,8 @@ class Subtitle(object):
         self.content = content
         self.proprietary = proprietary
 
-    def __hash__(self):
-        return hash(frozenset(vars(self).items()))
-
-    def __eq__(self, other):
-        return isinstance(other, Subtitle) and vars(self) == vars(other)
+    def _astuple(self):
+        return (self.index, self.start, self.end, self.content, self.proprietary)
 
     def __lt__(self, other):
         return (self.start, self.end, self.index) < (
@@ -135,51 +382,310 @@ class Subtitle(object):
             other.index,
         )
 
-    def __repr__(self):
-        # Python 2/3 cross compatibility
-        var_items = getattr(vars(self), "iteritems", getattr(vars(self), "items"))
-        item_list = ", ".join("%s=%r" % (k, v) for k, v in var_items())
-        return "%s(%s)" % (type(self).__name__, item_list)
+    def _srt_timestamps(self):
+        return (
+            timedelta_to_srt_timestamp(self.start),
+            timedelta_to_srt_timestamp(self.end),
+        )
 
-    def to_srt(self, strict=True, eol="\n"):
-        r"""
-        Convert the current :py:class:`Subtitle` to an SRT block.
 
-        :param bool strict: If disabled, will allow blank lines in the content
-                            of the SRT block, which is a violation of the SRT
-                            standard and may cause your media player to explode
-        :param str eol: The end of line string to use (default "\\n")
-        :returns: The metadata of the current :py:class:`Subtitle` object as an
-                  SRT formatted subtitle block
-        :rtype: str
+@functools.total_ordering
+class MillisecondSubtitle(BaseSubtitle):
+    r"""
+    Like a :py:class:`Subtitle`, but stores its start and end times as integer
+    milliseconds, rather than as :py:class:`~datetime.timedelta` objects. This
+    is cheaper to create, store, and compose, and is what :py:func:`parse`
+    returns with ``integer_ms=True``.
+
+    ``start`` and ``end`` are still available as
+    :py:class:`~datetime.timedelta` objects, but are converted on each access.
+    Setting them updates ``start_ms`` and ``end_ms``, dropping anything more
+    precise than a millisecond.
+
+    .. doctest::
+
+        >>> sub = MillisecondSubtitle(1, 1500, 2000, 'foo')
+        >>> sub.start
+        datetime.timedelta(seconds=1, microseconds=500000)
+        >>> sub.to_srt()
+        '1\n00:00:01,500 --> 00:00:02,000\nfoo\n\n'
+
+    :param index: The SRT index for this subtitle
+    :type index: int or None
+    :param int start_ms: The time in milliseconds that the subtitle should
+                         start being shown
+    :param int end_ms: The time in milliseconds that the subtitle should stop
+                       being shown
+    :param str proprietary: Proprietary metadata for this subtitle
+    :param str content: The subtitle content, see :py:class:`Subtitle`
+    """
+
+    __slots__ = ("start_ms", "end_ms")
+
+    _FIELDS = ("index", "start_ms", "end_ms", "content", "proprietary")
+
+    # pylint: disable=W0231
+    def __init__(self, index, start_ms, end_ms, content, proprietary=""):
+        self.index = index
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.content = content
+        self.proprietary = proprietary
+
+    def _astuple(self):
+        return (
+            self.index,
+            self.start_ms,
+            self.end_ms,
+            self.content,
+            self.proprietary,
+        )
+
+    @property
+    def start(self):
         """
-        output_content = self.content
-        output_proprietary = self.proprietary
+        :returns: ``start_ms``, as a timedelta
+        :rtype: :py:class:`datetime.timedelta`
+        """
+        return timedelta(0, 0, 0, self.start_ms)
 
-        if output_proprietary:
-            # output_proprietary is output directly next to the timestamp, so
-            # we need to add the space as a field delimiter.
-            output_proprietary = " " + output_proprietary
+    @start.setter
+    def start(self, value):
+        self.start_ms = timedelta_to_milliseconds(value)
 
-        if strict:
-            output_content = make_legal_content(output_content)
+    @property
+    def end(self):
+        """
+        :returns: ``end_ms``, as a timedelta
+        :rtype: :py:class:`datetime.timedelta`
+        """
+        return timedelta(0, 0, 0, self.end_ms)
 
-        if eol is None:
-            eol = "\n"
-        elif eol != "\n":
-            output_content = output_content.replace("\n", eol)
-
-        template = "{idx}{eol}{start} --> {end}{prop}{eol}{content}{eol}{eol}"
-        return template.format(
-            idx=self.index or 0,
-            start=timedelta_to_srt_timestamp(self.start),
-            end=timedelta_to_srt_timestamp(self.end),
-            prop=output_proprietary,
-            content=output_content,
-            eol=eol,
+    @end.setter
+    def end(self, value):
+        self.end_ms = timedelta_to_milliseconds(value)
+
+    def __lt__(self, other):
+        if isinstance(other, MillisecondSubtitle):
+            return (self.start_ms, self.end_ms, self.index) < (
+                other.start_ms,
+                other.end_ms,
+                other.index,
+            )
+        return _SORT_KEY(self) < _SORT_KEY(other)
+
+    def _srt_timestamps(self):
+        return (
+            milliseconds_to_srt_timestamp(self.start_ms),
+            milliseconds_to_srt_timestamp(self.end_ms),
         )
 
 
+def _get_lazy_content(subtitle):
+    """
+    The ``content`` getter for lazy subtitles, which takes the content from
+    the SRT data the first time it's called. Lazy subtitles keep their
+    content in ``_source`` once they have it, with ``_content_start`` set to
+    None.
+    """
+    # pylint: disable=protected-access
+    if subtitle._content_start is not None:
+        raw_content = subtitle._source[subtitle._content_start : subtitle._content_end]
+        _set_lazy_content(subtitle, raw_content.replace("\r\n", "\n"))
+    return subtitle._source
+
+
+def _set_lazy_content(subtitle, content):
+    """
+    The ``content`` setter for lazy subtitles.
+    """
+    # pylint: disable=protected-access
+    subtitle._source = content
+    subtitle._content_start = subtitle._content_end = None
+
+
+def _lazy_to_srt(subtitle, index, strict, eol):
+    """
+    :py:meth:`BaseSubtitle._to_srt` for lazy subtitles, which copies the
+    content straight from the SRT data where it can.
+    """
+    # pylint: disable=protected-access
+    content = _verbatim_content(subtitle, strict, eol)
+    if content is None:
+        return BaseSubtitle._to_srt(subtitle, index, strict, eol)
+
+    start, end = subtitle._srt_timestamps()
+    return _format_srt_block(
+        index,
+        start,
+        end,
+        content,
+        subtitle.proprietary,
+        strict,
+        eol,
+        verbatim=True,
+    )
+
+
+def _verbatim_content(subtitle, strict, eol):
+    """
+    :returns: The content of a lazy subtitle as it was in the source, if the
+              content hasn't been accessed yet and would come out of
+              :py:meth:`BaseSubtitle.to_srt` exactly the same, otherwise None
+    :rtype: str or None
+    """
+    # pylint: disable=protected-access
+    if subtitle._content_start is None:
+        return None
+
+    raw_content = subtitle._source[subtitle._content_start : subtitle._content_end]
+
+    if eol is None or eol == "\n":
+        eol = "\n"
+        if "\r" in raw_content:
+            return None
+    elif eol != "\r\n" or raw_content.count("\n") != raw_content.count(eol):
+        return None
+
+    # The same check as make_legal_content's, since every line ends with
+    # eol already
+    if strict and (
+        not raw_content or raw_content.startswith(eol) or eol + eol in raw_content
+    ):
+        return None
+
+    return raw_content
+
+
+class LazySubtitle(Subtitle):
+    r"""
+    A :py:class:`Subtitle` which keeps a reference to the SRT data it was
+    parsed from, and only takes its content from it when it is first
+    accessed. This is what :py:func:`parse` returns with ``lazy=True``.
+
+    If the content is never accessed, :py:meth:`to_srt` copies it straight
+    from the SRT data where it can, rather than normalising its line endings
+    only to change them back again.
+
+    Otherwise, it is the same as a :py:class:`Subtitle`, and compares equal
+    to one with the same fields.
+
+    .. doctest::
+
+        >>> srt = "1\r\n00:00:01,000 --> 00:00:02,000\r\nfoo\r\n"
+        >>> sub = next(parse(srt, lazy=True))
+        >>> sub.to_srt(eol="\r\n")
+        '1\r\n00:00:01,000 --> 00:00:02,000\r\nfoo\r\n\r\n'
+        >>> sub.content
+        'foo'
+
+    :param source: The SRT data to take the content from when it's first
+                   accessed, in which case ``content`` is the (start, end)
+                   span of the content in it, rather than the content itself.
+                   The other parameters are the same as :py:class:`Subtitle`'s.
+    :type source: str or None
+    """
+
+    # The content slot from Subtitle is unused, since the content is kept in
+    # _source once it has been taken from the SRT data
+    __slots__ = ("_source", "_content_start", "_content_end")
+
+    # pylint: disable=W0231
+    def __init__(self, index, start, end, content, proprietary="", source=None):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.proprietary = proprietary
+        if source is None:
+            _set_lazy_content(self, content)
+        else:
+            self._source = source
+            self._content_start, self._content_end = content
+
+    content = property(_get_lazy_content, _set_lazy_content)
+    _to_srt = _lazy_to_srt
+
+
+class LazyMillisecondSubtitle(MillisecondSubtitle):
+    """
+    A :py:class:`MillisecondSubtitle` with lazy content, like
+    :py:class:`LazySubtitle`. This is what :py:func:`parse` returns with
+    ``lazy=True`` and ``integer_ms=True``.
+    """
+
+    __slots__ = LazySubtitle.__slots__
+
+    # pylint: disable=W0231
+    def __init__(self, index, start_ms, end_ms, content, proprietary="", source=None):
+        self.index = index
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.proprietary = proprietary
+        if source is None:
+            _set_lazy_content(self, content)
+        else:
+            self._source = source
+            self._content_start, self._content_end = content
+
+    content = LazySubtitle.content
+    _to_srt = _lazy_to_srt
+
+
+def _format_srt_block(
+    index, start, end, content, proprietary, strict, eol, verbatim=False
+):
+    """
+    Format one SRT block from its already formatted timestamps.
+
+    :param int index: The index to write, or None to write 0
+    :param str start: The start timestamp, in SRT format
+    :param str end: The end timestamp, in SRT format
+    :param str content: The content of the subtitle
+    :param str proprietary: The proprietary metadata of the subtitle
+    :param bool strict: Whether to remove blank lines from the content
+    :param str eol: The end of line string to use, or None for "\\n"
+    :param bool verbatim: Whether ``content`` already ends its lines with
+                          ``eol``, and is legal if ``strict``, so can be
+                          written as it is
+    :rtype: str
+    """
+    if proprietary:
+        # proprietary is output directly next to the timestamp, so we need to
+        # add the space as a field delimiter.
+        proprietary = " " + proprietary
+
+    if eol is None:
+        eol = "\n"
+
+    if not verbatim:
+        if strict:
+            content = make_legal_content(content)
+        if eol != "\n":
+            content = content.replace("\n", eol)
+
+    try:
+        template = _BLOCK_TEMPLATES[eol]
+    except KeyError:
+        template = _block_template(eol)
+
+    return template % (index or 0, start, end, proprietary, content)
+
+
+def _block_template(eol):
+    """
+    :returns: A %-format template for an SRT block with lines ending in
+              ``eol``, taking the index, start, end, proprietary metadata
+              (with its leading space) and content
+    :rtype: str
+    """
+    return "%s{0}%s --> %s%s{0}%s{0}{0}".format(eol.replace("%", "%%"))
+
+
+# str.format with keywords is several times slower than this, and blocks are
+# formatted once per subtitle
+_BLOCK_TEMPLATES = {eol: _block_template(eol) for eol in ("\n", "\r\n")}
+
+
 def make_legal_content(content):
     r"""
     Remove illegal content from a content block. Illegal content includes:
@@ -207,6 +713,27 @@ def make_legal_content(content):
     return legal_content
 
 
+def _make_legal_content_bytes(content, codec):
+    """
+    The same as :py:func:`make_legal_content`, but for content encoded with
+    ``codec``, which must be ASCII compatible.
+
+    :param bytes content: The content to make legal
+    :param str codec: The codec ``content`` is encoded with, for logging
+    :rtype: bytes
+    """
+    if content and content[:1] != b"\n" and b"\n\n" not in content:
+        return content
+
+    legal_content = MULTI_WS_BYTES_REGEX.sub(b"\n", content.strip(b"\n"))
+    LOG.info(
+        "Legalised content %r to %r",
+        content.decode(codec, "replace"),
+        legal_content.decode(codec, "replace"),
+    )
+    return legal_content
+
+
 def timedelta_to_srt_timestamp(timedelta_timestamp):
     r"""
     Convert a :py:class:`~datetime.timedelta` to an SRT timestamp.
@@ -223,12 +750,7 @@ def timedelta_to_srt_timestamp(timedelta_timestamp):
     :returns: The timestamp in SRT format
     :rtype: str
     """
-
-    hrs, secs_remainder = divmod(timedelta_timestamp.seconds, SECONDS_IN_HOUR)
-    hrs += timedelta_timestamp.days * HOURS_IN_DAY
-    mins, secs = divmod(secs_remainder, SECONDS_IN_MINUTE)
-    msecs = timedelta_timestamp.microseconds // MICROSECONDS_IN_MILLISECOND
-    return "%02d:%02d:%02d,%03d" % (hrs, mins, secs, msecs)
+    return _format_milliseconds(timedelta_to_milliseconds(timedelta_timestamp))
 
 
 def srt_timestamp_to_timedelta(timestamp):
@@ -245,88 +767,533 @@ def srt_timestamp_to_timedelta(timestamp):
     :rtype: datetime.timedelta
     :raises TimestampParseError: If the timestamp is not parseable
     """
+    hrs, mins, secs, msecs = _timestamp_fields(timestamp)
+    return timedelta(
+        0,
+        int(hrs) * SECONDS_IN_HOUR + int(mins) * SECONDS_IN_MINUTE + int(secs),
+        0,
+        int(msecs or 0),
+    )
 
-    match = TS_REGEX.match(timestamp)
-    if match is None:
-        raise TimestampParseError("Unparseable timestamp: {}".format(timestamp))
-    hrs, mins, secs, msecs = [int(m) if m else 0 for m in match.groups()]
-    return timedelta(hours=hrs, minutes=mins, seconds=secs, milliseconds=msecs)
 
+def milliseconds_to_srt_timestamp(milliseconds):
+    r"""
+    Convert a number of milliseconds to an SRT timestamp.
+
+    .. doctest::
+
+        >>> milliseconds_to_srt_timestamp(4984000)
+        '01:23:04,000'
 
-def sort_and_reindex(subtitles, start_index=1, in_place=False, skip=True):
+    :param int milliseconds: The time in milliseconds
+    :returns: The timestamp in SRT format
+    :rtype: str
     """
-    Reorder subtitles to be sorted by start time order, and rewrite the indexes
-    to be in that same order. This ensures that the SRT file will play in an
-    expected fashion after, for example, times were changed in some subtitles
-    and they may need to be resorted.
+    return _format_milliseconds(milliseconds)
 
-    If skip=True, subtitles will also be skipped if they are considered not to
-    be useful. Currently, the conditions to be considered "not useful" are as
-    follows:
 
-    - Content is empty, or only whitespace
-    - The start time is negative
-    - The start time is equal to or later than the end time
+def srt_timestamp_to_milliseconds(timestamp):
+    r"""
+    Convert an SRT timestamp to a number of milliseconds.
 
     .. doctest::
 
-        >>> from datetime import timedelta
-        >>> one = timedelta(seconds=1)
-        >>> two = timedelta(seconds=2)
-        >>> three = timedelta(seconds=3)
-        >>> subs = [
-        ...     Subtitle(index=999, start=one, end=two, content='1'),
-        ...     Subtitle(index=0, start=two, end=three, content='2'),
-        ... ]
-        >>> list(sort_and_reindex(subs))  # doctest: +ELLIPSIS
-        [Subtitle(...index=1...), Subtitle(...index=2...)]
+        >>> srt_timestamp_to_milliseconds('01:23:04,000')
+        4984000
 
-    :param subtitles: :py:class:`Subtitle` objects in any order
-    :param int start_index: The index to start from
-    :param bool in_place: Whether to modify subs in-place for performance
-                          (version <=1.0.0 behaviour)
-    :param bool skip: Whether to skip subtitles considered not useful (see
-                      above for rules)
-    :returns: The sorted subtitles
-    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    :param str timestamp: A timestamp in SRT format
+    :returns: The timestamp in milliseconds
+    :rtype: int
+    :raises TimestampParseError: If the timestamp is not parseable
     """
-    skipped_subs = 0
-    for sub_num, subtitle in enumerate(sorted(subtitles), start=start_index):
-        if not in_place:
-            subtitle = Subtitle(**vars(subtitle))
+    hrs, mins, secs, msecs = _timestamp_fields(timestamp)
+    return _timestamp_fields_to_milliseconds(hrs, mins, secs, msecs or 0)
 
-        if skip:
-            try:
-                _should_skip_sub(subtitle)
-            except _ShouldSkipException as thrown_exc:
-                if subtitle.index is None:
-                    LOG.info("Skipped subtitle with no index: %s", thrown_exc)
-                else:
-                    LOG.info(
-                        "Skipped subtitle at index %d: %s", subtitle.index, thrown_exc
-                    )
-                skipped_subs += 1
-                continue
 
-        subtitle.index = sub_num - skipped_subs
+def set_timestamp_cache_size(maxsize):
+    r"""
+    Cache the most recently formatted timestamps, so that formatting the same
+    time again is a lookup. This is worth it when many subtitles share times,
+    for example after ``srt mux`` matches them up, but only slows things down
+    when they don't, so it's off by default.
 
-        yield subtitle
+    The cache is shared by everything which formats timestamps, and is only
+    available where :py:func:`functools.lru_cache` is (Python 3.2+).
+    Elsewhere, this does nothing. Since it's shared, pass the previous size
+    back in when you're done, so you don't change it for other callers.
 
+    .. doctest::
 
-def _should_skip_sub(subtitle):
-    """
+        >>> previous = set_timestamp_cache_size(1024)
+        >>> milliseconds_to_srt_timestamp(4984000)
+        '01:23:04,000'
+        >>> set_timestamp_cache_size(previous)
+        1024
+
+    :param int maxsize: How many timestamps to keep, or 0 to stop caching
+    :returns: The previous size, or 0 if timestamps weren't being cached
+    :rtype: int
+    """
+    global _format_milliseconds  # pylint: disable=global-statement
+    previous = 0
+    if _format_milliseconds is not _format_milliseconds_uncached:
+        previous = _format_milliseconds.cache_info().maxsize
+
+    if maxsize and _lru_cache is not None:
+        _format_milliseconds = _lru_cache(maxsize=maxsize)(
+            _format_milliseconds_uncached
+        )
+    else:
+        _format_milliseconds = _format_milliseconds_uncached
+    return previous
+
+
+def _timestamp_fields(timestamp):
+    """
+    :returns: The hours, minutes, seconds, and milliseconds of an SRT
+              timestamp, as strings. Milliseconds may be empty.
+    :rtype: tuple
+    :raises TimestampParseError: If the timestamp is not parseable
+    """
+    match = CANONICAL_TS_REGEX.match(timestamp) or TS_REGEX.match(timestamp)
+    if match is None:
+        raise TimestampParseError("Unparseable timestamp: {}".format(timestamp))
+    return match.groups()
+
+
+# Formatting is done twice per subtitle when composing, so rather than
+# %-formatting each field, look the zero padded fields up in these
+_TWO_DIGITS = tuple("%02d" % num for num in range(100))
+_THREE_DIGITS = tuple("%03d" % num for num in range(MILLISECONDS_IN_SECOND))
+_MINUTES_AND_SECONDS = tuple(
+    ":%02d:%02d," % divmod(secs, SECONDS_IN_MINUTE) for secs in range(SECONDS_IN_HOUR)
+)
+
+
+def _format_milliseconds_uncached(milliseconds):
+    """
+    The implementation of :py:func:`milliseconds_to_srt_timestamp`.
+    """
+    # Flooring here matches what timedeltas do for negative times, where only
+    # the hours end up negative
+    secs, msecs = divmod(milliseconds, MILLISECONDS_IN_SECOND)
+    hrs, secs = divmod(secs, SECONDS_IN_HOUR)
+    if 0 <= hrs < len(_TWO_DIGITS):
+        try:
+            return _TWO_DIGITS[hrs] + _MINUTES_AND_SECONDS[secs] + _THREE_DIGITS[msecs]
+        except TypeError:
+            # Not an integer, so %-formatting has to truncate it for us
+            pass
+    mins, secs = divmod(secs, SECONDS_IN_MINUTE)
+    return "%02d:%02d:%02d,%03d" % (hrs, mins, secs, msecs)
+
+
+_format_milliseconds = _format_milliseconds_uncached
+
+
+def timedelta_to_milliseconds(delta):
+    """
+    Convert a :py:class:`~datetime.timedelta` to integer milliseconds, rounding
+    down in the same way as :py:func:`timedelta_to_srt_timestamp`.
+
+    .. doctest::
+
+        >>> import datetime
+        >>> timedelta_to_milliseconds(datetime.timedelta(seconds=1.5))
+        1500
+
+    :param datetime.timedelta delta: The timedelta to convert
+    :returns: ``delta`` in milliseconds
+    :rtype: int
+    """
+    return (
+        delta.days * SECONDS_IN_DAY + delta.seconds
+    ) * MILLISECONDS_IN_SECOND + delta.microseconds // MICROSECONDS_IN_MILLISECOND
+
+
+def sort_and_reindex(
+    subtitles, start_index=1, in_place=False, skip=True, window=None, run_size=None
+):
+    """
+    Reorder subtitles to be sorted by start time order, and rewrite the indexes
+    to be in that same order. This ensures that the SRT file will play in an
+    expected fashion after, for example, times were changed in some subtitles
+    and they may need to be resorted.
+
+    If skip=True, subtitles will also be skipped if they are considered not to
+    be useful. Currently, the conditions to be considered "not useful" are as
+    follows:
+
+    - Content is empty, or only whitespace
+    - The start time is negative
+    - The start time is equal to or later than the end time
+
+    .. doctest::
+
+        >>> from datetime import timedelta
+        >>> one = timedelta(seconds=1)
+        >>> two = timedelta(seconds=2)
+        >>> three = timedelta(seconds=3)
+        >>> subs = [
+        ...     Subtitle(index=999, start=one, end=two, content='1'),
+        ...     Subtitle(index=0, start=two, end=three, content='2'),
+        ... ]
+        >>> list(sort_and_reindex(subs))  # doctest: +ELLIPSIS
+        [Subtitle(...index=1...), Subtitle(...index=2...)]
+
+    :param subtitles: :py:class:`Subtitle` objects in any order
+    :param int start_index: The index to start from
+    :param bool in_place: Whether to modify subs in-place for performance
+                          (version <=1.0.0 behaviour)
+    :param bool skip: Whether to skip subtitles considered not useful (see
+                      above for rules)
+    :param int window: If given, rather than reading all of ``subtitles``
+                       before yielding any, only hold back this many at a
+                       time, and sort within them. This suits input like
+                       :py:func:`parse_stream` output, which is usually
+                       sorted, or only out of order locally. Subtitles are
+                       sorted by start time, end time, and index, the same as
+                       :py:class:`Subtitle` objects compare.
+    :param int run_size: If given, only hold this many subtitles in memory
+                         at once while sorting. Sorted runs of this many are
+                         written to temporary files, and merged back together
+                         as the subtitles are yielded, so ``subtitles`` can
+                         be more than fits in memory (for example, from
+                         :py:func:`parse_stream`). Subtitles are sorted the
+                         same way as with ``window``, and are rebuilt from
+                         their fields when read back, the same way as
+                         :py:meth:`BaseSubtitle.copy` does.
+    :returns: The sorted subtitles
+    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    :raises SubtitleOrderError: If ``window`` is given, and a subtitle is more
+                                than ``window`` subtitles out of order
+    """
+    if window is not None and run_size is not None:
+        raise ValueError("window and run_size cannot be used together")
+
+    if window is not None:
+        subtitles = _window_sorted(subtitles, window)
+    elif run_size is not None:
+        subtitles = _external_sorted(subtitles, run_size)
+    else:
+        subtitles = _sorted_subtitles(subtitles)
+
+    for subtitle in _reindex(subtitles, start_index, in_place, skip):
+        yield subtitle
+
+
+def _window_sorted(subtitles, window):
+    """
+    Sort subtitles that are at most ``window`` subtitles out of order, as they
+    are read. See :py:func:`sort_and_reindex`.
+
+    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    :raises SubtitleOrderError: If a subtitle is further out of order
+    """
+    if window < 0:
+        raise ValueError("window must be at least 0, got {!r}".format(window))
+
+    # The position in the input breaks ties, so that the sort is stable, like
+    # sorted(), and subtitles themselves never need to be compared
+    pending = []
+    last_key = None
+
+    for position, subtitle in enumerate(subtitles):
+        entry = (_SORT_KEY(subtitle), position, subtitle)
+
+        if last_key is not None and entry[0] < last_key:
+            raise SubtitleOrderError(subtitle, window)
+
+        if len(pending) < window:
+            heapq.heappush(pending, entry)
+        else:
+            last_key, _, earliest = heapq.heappushpop(pending, entry)
+            yield earliest
+
+    while pending:
+        yield heapq.heappop(pending)[2]
+
+
+def _external_sorted(subtitles, run_size):
+    """
+    Sort subtitles while holding at most ``run_size`` of them in memory at
+    once. See :py:func:`sort_and_reindex`.
+
+    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    """
+    if run_size < 1:
+        raise ValueError("run_size must be at least 1, got {!r}".format(run_size))
+
+    subtitles = iter(subtitles)
+    run = list(itertools.islice(subtitles, run_size))
+    run.sort(key=_SORT_KEY)
+
+    run_files = []
+    classes = {}
+    try:
+        while len(run) == run_size:
+            run_files.append(_write_run(run, classes))
+            run = list(itertools.islice(subtitles, run_size))
+            run.sort(key=_SORT_KEY)
+
+        if not run_files:
+            # Everything fit in one run, so there's nothing to merge
+            for subtitle in run:
+                yield subtitle
+            return
+
+        # The run number breaks ties, so that subtitles from earlier in the
+        # input come first, like sorted(), and are never compared themselves
+        classes = sorted(classes, key=classes.get)
+        runs = [
+            _read_run(run_file, run_num, classes)
+            for run_num, run_file in enumerate(run_files)
+        ]
+        runs.append((_SORT_KEY(subtitle), len(runs), subtitle) for subtitle in run)
+
+        for _, _, subtitle in heapq.merge(*runs):
+            yield subtitle
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+def _write_run(run, classes):
+    """
+    Write a sorted run of subtitles to a new temporary file, in batches of
+    EXTERNAL_SORT_BATCH_SIZE, so that they can be read back a batch at a time.
+
+    :param dict classes: The number of each subtitle class written so far,
+                         which any new classes are added to
+    :returns: The temporary file, which is deleted when it is closed
+    """
+    run_file = tempfile.TemporaryFile()
+
+    try:
+        for batch_start in range(0, len(run), EXTERNAL_SORT_BATCH_SIZE):
+            batch = run[batch_start : batch_start + EXTERNAL_SORT_BATCH_SIZE]
+            data = b"".join(_encode_run_record(subtitle, classes) for subtitle in batch)
+            run_file.write(_RUN_BATCH.pack(len(data)))
+            run_file.write(data)
+        run_file.seek(0)
+    except BaseException:
+        run_file.close()
+        raise
+
+    return run_file
+
+
+def _encode_run_record(subtitle, classes):
+    """
+    :returns: ``subtitle`` as a _RUN_RECORD and the strings following it
+    :rtype: bytes
+    """
+    # pylint: disable=protected-access
+    index, start, end, content, proprietary = subtitle._astuple()
+    flags = 0
+
+    if index is None:
+        flags |= _RUN_NO_INDEX
+        index = ""
+
+    if isinstance(start, timedelta):
+        start_days, start_time = start.days, start.seconds * 10**6 + start.microseconds
+    else:
+        flags |= _RUN_START_MS
+        start_days, start_time = 0, start
+
+    if isinstance(end, timedelta):
+        end_days, end_time = end.days, end.seconds * 10**6 + end.microseconds
+    else:
+        flags |= _RUN_END_MS
+        end_days, end_time = 0, end
+
+    strings = [
+        "{}".format(index).encode("ascii"),
+        content.encode("utf-8", _RUN_STRING_ERRORS),
+        proprietary.encode("utf-8", _RUN_STRING_ERRORS),
+    ]
+    header = _RUN_RECORD.pack(
+        classes.setdefault(type(subtitle), len(classes)),
+        flags,
+        start_days,
+        start_time,
+        end_days,
+        end_time,
+        *map(len, strings)
+    )
+    return header + b"".join(strings)
+
+
+def _read_run(run_file, run_num, classes):
+    """
+    Read back a run written by :py:func:`_write_run`, one batch at a time.
+
+    :param list classes: The subtitle classes, by number
+    :returns: The sort key, run number, and subtitle, for each subtitle
+    :rtype: :term:`generator` of tuples
+    """
+    while True:
+        header = run_file.read(_RUN_BATCH.size)
+        if not header:
+            return
+
+        (data_len,) = _RUN_BATCH.unpack(header)
+        data = run_file.read(data_len)
+        pos = 0
+        while pos < data_len:
+            subtitle, pos = _decode_run_record(data, pos, classes)
+            yield _SORT_KEY(subtitle), run_num, subtitle
+
+
+def _decode_run_record(data, pos, classes):
+    """
+    Decode the record written by :py:func:`_encode_run_record` at ``pos``.
+
+    :returns: The subtitle, and the position of the next record
+    :rtype: tuple
+    """
+    fields = _RUN_RECORD.unpack_from(data, pos)
+    class_num, flags, start_days, start_time, end_days, end_time = fields[:6]
+    index_end = pos + _RUN_RECORD.size + fields[6]
+    content_end = index_end + fields[7]
+    proprietary_end = content_end + fields[8]
+
+    index = None
+    if not flags & _RUN_NO_INDEX:
+        index = int(data[pos + _RUN_RECORD.size : index_end])
+
+    subtitle = classes[class_num](
+        index,
+        _decode_run_time(flags & _RUN_START_MS, start_days, start_time),
+        _decode_run_time(flags & _RUN_END_MS, end_days, end_time),
+        data[index_end:content_end].decode("utf-8", _RUN_STRING_ERRORS),
+        data[content_end:proprietary_end].decode("utf-8", _RUN_STRING_ERRORS),
+    )
+    return subtitle, proprietary_end
+
+
+def _decode_run_time(is_ms, days, time):
+    """
+    :returns: A start or end time stored by :py:func:`_encode_run_record`
+    :rtype: :py:class:`datetime.timedelta` or int
+    """
+    if is_ms:
+        return time
+    return timedelta(days, 0, time)
+
+
+def _reindex(subtitles, start_index, in_place, skip):
+    """
+    The reindexing and skipping part of :py:func:`sort_and_reindex`, for
+    subtitles which are already sorted.
+
+    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    """
+    for index, subtitle in _number_subtitles(subtitles, start_index, skip):
+        if not in_place:
+            subtitle = subtitle.copy()
+        subtitle.index = index
+        yield subtitle
+
+
+def _number_subtitles(subtitles, start_index, skip):
+    """
+    Work out the index each of the (already sorted) subtitles should have,
+    without changing them.
+
+    :returns: The new index and the subtitle, for each subtitle not skipped
+    :rtype: :term:`generator` of (int, :py:class:`Subtitle`) tuples
+    """
+    index = start_index
+    for subtitle in subtitles:
+        if skip:
+            try:
+                _should_skip_sub(subtitle)
+            except _ShouldSkipException as thrown_exc:
+                if subtitle.index is None:
+                    LOG.info("Skipped subtitle with no index: %s", thrown_exc)
+                else:
+                    LOG.info(
+                        "Skipped subtitle at index %d: %s", subtitle.index, thrown_exc
+                    )
+                continue
+
+        yield index, subtitle
+        index += 1
+
+
+def _sorted_subtitles(subtitles):
+    """
+    Sort subtitles into the same order as ``sorted(subtitles)``, but by
+    comparing precomputed keys where possible, rather than calling
+    :py:meth:`Subtitle.__lt__` (and building two tuples) for every comparison.
+
+    :rtype: list
+    """
+    subtitles = list(subtitles)
+    lt_classes = set(
+        _defining_class(subtitle_type, "__lt__")
+        for subtitle_type in set(map(type, subtitles))
+    )
+
+    if lt_classes == {MillisecondSubtitle}:
+        # Comparing integers is cheaper than building timedeltas to compare
+        subtitles.sort(key=_MILLISECOND_SORT_KEY)
+    elif lt_classes <= {Subtitle, MillisecondSubtitle}:
+        subtitles.sort(key=_SORT_KEY)
+    else:
+        # Someone has their own idea of how to order subtitles
+        subtitles.sort()
+
+    return subtitles
+
+
+# The same order as Subtitle.__lt__ and MillisecondSubtitle.__lt__
+_SORT_KEY = operator.attrgetter("start", "end", "index")
+_MILLISECOND_SORT_KEY = operator.attrgetter("start_ms", "end_ms", "index")
+
+
+def _defining_class(cls, name):
+    """
+    :returns: The class in ``cls``'s MRO which defines the attribute ``name``,
+              or None if none of them do
+    :rtype: type
+    """
+    return next((klass for klass in cls.__mro__ if name in vars(klass)), None)
+
+
+def _should_skip_sub(subtitle):
+    """
     Check if a subtitle should be skipped based on the rules in
     SUBTITLE_SKIP_CONDITIONS.
 
     :param subtitle: A :py:class:`Subtitle` to check whether to skip
     :raises _ShouldSkipException: If the subtitle should be skipped
     """
-    for info_msg, sub_skipper in SUBTITLE_SKIP_CONDITIONS:
-        if sub_skipper(subtitle):
-            raise _ShouldSkipException(info_msg)
+    skip_reason = _skip_reason(
+        not subtitle.content.strip(), subtitle.start, subtitle.end, ZERO_TIMEDELTA
+    )
+    if skip_reason is not None:
+        raise _ShouldSkipException(skip_reason)
 
 
-def parse(srt, ignore_errors=False):
+def _skip_reason(blank, start, end, zero):
+    """
+    Check a subtitle's fields against _SKIP_RULES.
+
+    :returns: Why the subtitle should be skipped, or None
+    :rtype: str
+    """
+    for info_msg, rule in _SKIP_RULES:
+        if rule(blank, start, end, zero):
+            return info_msg
+    return None
+
+
+def parse(
+    srt, ignore_errors=False, engine="fast", integer_ms=False, jobs=1, lazy=False
+):
     r'''
     Convert an SRT formatted string (in Python 2, a :class:`unicode` object) to
     a :term:`generator` of Subtitle objects.
@@ -350,63 +1317,891 @@ def parse(srt, ignore_errors=False):
         >>> list(subs)  # doctest: +ELLIPSIS
         [Subtitle(...index=422...), Subtitle(...index=423...)]
 
-    :param srt: Subtitles in SRT format
-    :type srt: str or a file-like object
-    :param ignore_errors: If True, garbled SRT data will be ignored, and we'll
-                          continue trying to parse the rest of the file,
-                          instead of raising :py:class:`SRTParseError` and
-                          stopping execution.
-    :returns: The subtitles contained in the SRT file as :py:class:`Subtitle`
-              objects
-    :rtype: :term:`generator` of :py:class:`Subtitle` objects
-    :raises SRTParseError: If the matches are not contiguous and
-                           ``ignore_errors`` is False.
-    '''
+    :param srt: Subtitles in SRT format
+    :type srt: str or a file-like object
+    :param ignore_errors: If True, garbled SRT data will be ignored, and we'll
+                          continue trying to parse the rest of the file,
+                          instead of raising :py:class:`SRTParseError` and
+                          stopping execution.
+    :param str engine: "fast" to parse strictly valid blocks with a
+                       line-oriented tokenizer, only using the regex around
+                       blocks it can't handle, or "regex" to always use the
+                       regex. Both give the same results.
+    :param bool integer_ms: If True, return :py:class:`MillisecondSubtitle`
+                            objects, which store times as integer
+                            milliseconds instead of
+                            :py:class:`~datetime.timedelta` objects
+    :param jobs: How many processes to parse large inputs with, or None for
+                 one per CPU. The input is split between blocks, so the
+                 results (and any :py:class:`SRTParseError`) are the same as
+                 when parsing it in one go. As with any use of
+                 :py:mod:`multiprocessing`, on platforms which don't fork, your
+                 main module needs an ``if __name__ == "__main__"`` guard.
+    :type jobs: int or None
+    :param bool lazy: If True, return :py:class:`LazySubtitle` (or
+                      :py:class:`LazyMillisecondSubtitle`) objects, which
+                      only take their content from ``srt`` when it is first
+                      accessed. This is cheaper when you mostly need timings,
+                      but keeps ``srt`` alive for as long as any of the
+                      subtitles are. Only used when ``jobs`` is 1.
+    :returns: The subtitles contained in the SRT file as :py:class:`Subtitle`
+              objects
+    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    :raises SRTParseError: If the matches are not contiguous and
+                           ``ignore_errors`` is False.
+    :raises ValueError: If ``engine`` is not known, or ``jobs`` is less than 1
+    '''
+
+    if jobs != 1:
+        subtitles = _parse_parallel(srt, ignore_errors, engine, integer_ms, jobs)
+    elif lazy:
+        # The subtitles need the data itself to refer to
+        if isinstance(srt, FILE_TYPES):
+            srt = srt.read()
+        subtitles = (
+            _lazy_subtitle_from_groups(srt, groups, integer_ms)
+            for groups in _parse_groups(srt, ignore_errors, engine, spans=True)
+        )
+    else:
+        subtitles = (
+            _subtitle_from_groups(groups, integer_ms)
+            for groups in _parse_groups(srt, ignore_errors, engine)
+        )
+
+    for subtitle in subtitles:
+        yield subtitle
+
+
+def _parse_groups(srt, ignore_errors, engine, spans=False):
+    """
+    The matching part of :py:func:`parse`, see there for the parameters.
+
+    :param bool spans: See :py:func:`_match_blocks`
+    :returns: The groups that SRT_REGEX would have matched for each block
+    :rtype: :term:`generator` of tuples
+    """
+    _check_engine(engine)
+    expected_start = 0
+
+    # Transparently read files -- the whole thing is needed for regex's
+    # finditer
+    if isinstance(srt, FILE_TYPES):
+        srt = srt.read()
+
+    blocks = _match_blocks(srt, len(srt), engine, spans)
+    for actual_start, actual_end, groups in blocks:
+        _check_contiguity(srt, expected_start, actual_start, ignore_errors)
+        yield groups
+        expected_start = actual_end
+
+    _check_contiguity(srt, expected_start, len(srt), ignore_errors)
+
+
+def parse_stream(
+    srt,
+    ignore_errors=False,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    engine="fast",
+    integer_ms=False,
+):
+    r'''
+    Like :py:func:`parse`, but reads ``srt`` incrementally instead of reading
+    the whole file up front. Each :py:class:`Subtitle` is yielded as soon as
+    enough data has been read to know that its block is complete, so memory
+    use is bounded by ``chunk_size`` plus the size of the largest block, rather
+    than by the size of the file.
+
+    The input is only split before an index line which is followed by a
+    timestamp, and not straight after a timestamp line, so if the input has
+    no index lines (or has long runs of unparseable data), everything up to
+    the next one is buffered.
+
+    The results, including the tolerance for missing or extra blank lines and
+    the :py:class:`SRTParseError` offsets when ``ignore_errors`` is False, are
+    the same as calling :py:func:`parse` on the whole file.
+
+    .. doctest::
+
+        >>> from io import StringIO
+        >>> subs = parse_stream(StringIO("""\
+        ... 1
+        ... 00:00:01,000 --> 00:00:02,000
+        ... Hello
+        ...
+        ... 2
+        ... 00:00:03,000 --> 00:00:04,000
+        ... World
+        ... """), chunk_size=16)
+        >>> [sub.content for sub in subs]
+        ['Hello', 'World']
+
+    :param srt: Subtitles in SRT format
+    :type srt: a file-like object opened in text mode
+    :param ignore_errors: See :py:func:`parse`
+    :param int chunk_size: How many characters to read from ``srt`` at once
+    :param str engine: See :py:func:`parse`
+    :param bool integer_ms: See :py:func:`parse`
+    :returns: The subtitles contained in the SRT file as :py:class:`Subtitle`
+              objects
+    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    :raises SRTParseError: If the matches are not contiguous and
+                           ``ignore_errors`` is False.
+    :raises ValueError: If ``engine`` is not known
+    '''
+
+    _check_engine(engine)
+
+    # We only ever hand SRT_REGEX data up to a split point from
+    # _block_boundaries. A block's content stops at a newline followed by an
+    # index and timestamp just as it does at the end of the input, unless
+    # it's empty, in which case the split point would be straight after its
+    # timestamp line, which _block_boundaries rules out. So any match started
+    # earlier must end there either way. Since a timestamp can't contain a
+    # newline or start on an index line, none of SRT_REGEX's lookaheads from
+    # earlier on can reach past it either, so no earlier decision depends on
+    # what comes after it.
+    #
+    # Anything after the last match (say, garbage before the split point) is
+    # kept in the buffer and rematched next time around, since the next match
+    # may well start inside it when we have the full picture.
+    buf = ""
+    buf_offset = 0
+    searched_to = 0
+    at_eof = False
+
+    while not at_eof:
+        chunk = srt.read(chunk_size)
+
+        if chunk:
+            buf += chunk
+            split_at = _last_block_boundary(
+                buf, max(searched_to - BOUNDARY_SEARCH_OVERLAP, 0)
+            )
+            searched_to = len(buf)
+            if split_at is None:
+                continue
+        else:
+            at_eof = True
+            split_at = len(buf)
+
+        expected_start = 0
+        for actual_start, actual_end, groups in _match_blocks(buf, split_at, engine):
+            _check_contiguity(
+                buf, expected_start, actual_start, ignore_errors, offset=buf_offset
+            )
+            yield _subtitle_from_groups(groups, integer_ms)
+            expected_start = actual_end
+
+        if at_eof:
+            _check_contiguity(
+                buf, expected_start, len(buf), ignore_errors, offset=buf_offset
+            )
+        else:
+            buf = buf[expected_start:]
+            buf_offset += expected_start
+            searched_to -= expected_start
+
+
+def _last_block_boundary(srt, pos=0):
+    """
+    Find the last block boundary in ``srt``, see :py:func:`_block_boundaries`.
+
+    :param str srt: The data to search
+    :param int pos: Where to start searching
+    :returns: The position at the start of the index line, or None if there is
+              no such boundary
+    :rtype: int or None
+    """
+    split_at = None
+    for split_at in _block_boundaries(srt, pos):
+        pass
+    return split_at
+
+
+def _block_boundaries(
+    srt,
+    pos=0,
+    boundary_regex=BLOCK_BOUNDARY_REGEX,
+    arrow_regex=TIMESTAMP_ARROW_REGEX,
+):
+    """
+    Find the positions in ``srt`` where it can be split without changing how
+    SRT_REGEX would match it as a whole.
+
+    That's before an index line which is followed by a timestamp, unless the
+    line before it has a timestamp arrow in it. If that line is a block's
+    timestamp line, the block has no content, and SRT_REGEX only ends a block
+    like that at a blank line, so it would take the index and timestamp lines
+    after it as its content instead. Content lines which happen to have an
+    arrow in them are rare enough that we don't try to tell them apart.
+
+    :param srt: The data to search
+    :type srt: str, bytes, or :py:class:`mmap.mmap`
+    :param int pos: Where to start searching
+    :param boundary_regex: BLOCK_BOUNDARY_REGEX, or the bytes version of it
+    :param arrow_regex: TIMESTAMP_ARROW_REGEX, or the bytes version of it
+    :returns: The position at the start of each index line
+    :rtype: :term:`generator` of int
+    """
+    for match in boundary_regex.finditer(srt, pos):
+        line_end = match.start()
+        line_start = srt.rfind(match.group(), 0, line_end) + 1
+        if arrow_regex.search(srt, line_start, line_end) is None:
+            yield match.end()
+
+
+def _parse_parallel(srt, ignore_errors, engine, integer_ms, jobs):
+    """
+    The parallel part of :py:func:`parse`, see there for the parameters.
+
+    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    """
+    # multiprocessing takes about as long to import as we do, so only pay for
+    # it when it's actually used
+    import multiprocessing  # pylint: disable=import-outside-toplevel
+
+    _check_engine(engine)
+
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    elif jobs < 1:
+        raise ValueError("jobs must be at least 1, got {!r}".format(jobs))
+
+    if isinstance(srt, FILE_TYPES):
+        srt = srt.read()
+
+    parts = min(jobs * PARALLEL_CHUNKS_PER_JOB, len(srt) // PARALLEL_MIN_CHUNK_SIZE)
+    if parts < 2:
+        for groups in _parse_groups(srt, ignore_errors, engine):
+            yield _subtitle_from_groups(groups, integer_ms)
+        return
+
+    # Each chunk can be matched on its own for the same reasons as in
+    # parse_stream, and since we check contiguity here on the whole input,
+    # SRTParseError offsets come out the same as if we'd done it in one go
+    split_points = _split_points(srt, parts)
+    chunks = [
+        (srt[chunk_start:chunk_end], engine)
+        for chunk_start, chunk_end in zip(split_points, split_points[1:])
+    ]
+
+    with _terminating(multiprocessing.Pool(min(jobs, len(chunks)))) as pool:
+        for subtitle in _merge_chunk_rows(
+            srt,
+            split_points,
+            pool.imap(_parse_chunk, chunks),
+            ignore_errors,
+            integer_ms,
+        ):
+            yield subtitle
+
+
+@contextlib.contextmanager
+def _terminating(pool):
+    """
+    Stop ``pool``'s workers and wait for them when the block exits. Pools
+    aren't context managers at all on Python 2, and on Python 3 they don't
+    wait.
+
+    :param pool: A :py:class:`multiprocessing.pool.Pool`
+    :returns: ``pool``
+    """
+    try:
+        yield pool
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _merge_chunk_rows(srt, split_points, chunk_rows, ignore_errors, integer_ms):
+    """
+    Turn the rows :py:func:`_parse_chunk` returns for each chunk back into
+    subtitles, checking contiguity across the whole input.
+
+    :param str srt: The whole input
+    :param split_points: See :py:func:`_split_points`
+    :param chunk_rows: The rows for each chunk, in order
+    :param ignore_errors: See :py:func:`parse`
+    :param bool integer_ms: See :py:func:`parse`
+    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    """
+    expected_start = 0
+
+    for chunk_start, rows in zip(split_points, chunk_rows):
+        for row in rows:
+            actual_start = row[0] + chunk_start
+            if actual_start == chunk_start and actual_start > expected_start:
+                # SRT_REGEX starts with \s*, so on the whole input, this match
+                # would have started at any whitespace just before the split
+                skipped = srt[expected_start:actual_start]
+                actual_start = expected_start + len(skipped.rstrip())
+
+            _check_contiguity(srt, expected_start, actual_start, ignore_errors)
+            yield _subtitle_from_fields(row[2:], integer_ms)
+            expected_start = row[1] + chunk_start
+
+    _check_contiguity(srt, expected_start, len(srt), ignore_errors)
+
+
+def _subtitle_from_fields(fields, integer_ms):
+    """
+    Build a :py:class:`Subtitle` from the fields of a
+    :py:class:`MillisecondSubtitle`.
+
+    :rtype: :py:class:`Subtitle`
+    """
+    index, start_ms, end_ms, content, proprietary = fields
+
+    if integer_ms:
+        return MillisecondSubtitle(index, start_ms, end_ms, content, proprietary)
+
+    return Subtitle(
+        index,
+        timedelta(milliseconds=start_ms),
+        timedelta(milliseconds=end_ms),
+        content,
+        proprietary,
+    )
+
+
+def _split_points(srt, parts):
+    """
+    Find positions spread evenly through ``srt`` where it can be split, using
+    :py:func:`_block_boundaries`.
+
+    :param str srt: The data to split
+    :param int parts: How many parts to aim for
+    :returns: The start of each part, followed by the end of the last part
+    :rtype: list of int
+    """
+    split_points = [0]
+
+    for part in range(1, parts):
+        target = max(len(srt) * part // parts, split_points[-1])
+        split_at = next(_block_boundaries(srt, target), None)
+        if split_at is None:
+            break
+        split_points.append(split_at)
+
+    split_points.append(len(srt))
+    return split_points
+
+
+def _parse_chunk(args):
+    """
+    Parse one chunk of the input in a worker process for
+    :py:func:`_parse_parallel`. Timestamps are converted here to get as
+    much work as possible out of the main process, but we only return plain
+    tuples, since they are much cheaper to send back than :py:class:`Subtitle`
+    objects.
+
+    :param tuple args: The chunk, and the parsing engine to use
+    :returns: The start and end of each block in the chunk, followed by the
+              fields of a :py:class:`MillisecondSubtitle` for it
+    :rtype: list of tuples
+    """
+    chunk, engine = args
+    rows = []
+
+    for start, end, groups in _match_blocks(chunk, len(chunk), engine):
+        subtitle = _subtitle_from_groups(groups, integer_ms=True)
+        rows.append((start, end) + subtitle._astuple())  # pylint: disable=W0212
+
+    return rows
+
+
+def parse_file(
+    path, encoding="utf-8", ignore_errors=False, engine="fast", integer_ms=False
+):
+    r"""
+    Like :py:func:`parse`, but takes the path of an SRT file instead of its
+    contents.
+
+    For UTF-8 and ASCII files, the file is memory mapped and parsed with
+    :py:func:`parse_bytes`. This means that the file is never held in memory
+    as a whole (twice, once as bytes and once decoded), and that processes
+    parsing the same file share its pages. Other encodings are read and
+    parsed as usual.
+
+    Either way, the results are the same as reading and decoding the file
+    yourself, and passing it to :py:func:`parse`. Line endings are not
+    translated.
+
+    The file must not be modified until parsing is finished.
+
+    :param str path: The path of the SRT file
+    :param str encoding: The encoding of the file
+    :param ignore_errors: See :py:func:`parse`
+    :param str engine: See :py:func:`parse`
+    :param bool integer_ms: See :py:func:`parse`
+    :returns: The subtitles contained in the SRT file as :py:class:`Subtitle`
+              objects
+    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    :raises SRTParseError: If the matches are not contiguous and
+                           ``ignore_errors`` is False.
+    :raises ValueError: If ``engine`` is not known
+    :raises UnicodeDecodeError: If the file isn't valid in ``encoding``
+    """
+    _check_engine(engine)
+
+    if codecs.lookup(encoding).name not in BYTES_ENGINE_CODECS:
+        with io.open(path, encoding=encoding, newline="") as srt_f:
+            srt = srt_f.read()
+        for subtitle in parse(srt, ignore_errors, engine, integer_ms):
+            yield subtitle
+        return
+
+    with open(path, "rb") as srt_f:
+        if os.fstat(srt_f.fileno()).st_size == 0:
+            # mmap can't map empty files, and there's nothing to parse anyway
+            return
+
+        data = mmap.mmap(srt_f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for subtitle in parse_bytes(
+                data, encoding, ignore_errors, engine, integer_ms
+            ):
+                yield subtitle
+        finally:
+            data.close()
+
+
+def parse_bytes(
+    data, encoding="utf-8", ignore_errors=False, engine="fast", integer_ms=False
+):
+    r"""
+    Like :py:func:`parse`, but takes encoded SRT data instead of a string.
+
+    For UTF-8 and ASCII, strictly valid blocks are parsed straight from the
+    undecoded bytes, and only the content and proprietary metadata of each
+    subtitle are decoded. Anything else is decoded a window at a time and
+    parsed as with :py:func:`parse_stream`. Other encodings are decoded in
+    full and parsed as usual.
+
+    Either way, the results are the same as decoding ``data`` yourself and
+    passing it to :py:func:`parse`.
+
+    .. doctest::
+
+        >>> subs = parse_bytes(b'1\n00:00:01,000 --> 00:00:02,000\nCaf\xc3\xa9\n\n')
+        >>> list(subs)[0].content == u'Caf\xe9'
+        True
+
+    :param bytes data: The encoded SRT data, or anything else supporting the
+                       buffer protocol, like a :py:class:`mmap.mmap`
+    :param str encoding: The encoding of ``data``
+    :param ignore_errors: See :py:func:`parse`
+    :param str engine: See :py:func:`parse`
+    :param bool integer_ms: See :py:func:`parse`
+    :returns: The subtitles contained in ``data`` as :py:class:`Subtitle`
+              objects
+    :rtype: :term:`generator` of :py:class:`Subtitle` objects
+    :raises SRTParseError: If the matches are not contiguous and
+                           ``ignore_errors`` is False.
+    :raises ValueError: If ``engine`` is not known
+    :raises UnicodeDecodeError: If ``data`` isn't valid in ``encoding``
+    """
+    _check_engine(engine)
+    codec_name = codecs.lookup(encoding).name
+
+    if codec_name not in BYTES_ENGINE_CODECS:
+        for subtitle in parse(
+            codecs.decode(data, encoding), ignore_errors, engine, integer_ms
+        ):
+            yield subtitle
+        return
+
+    codec = BYTES_ENGINE_CODECS[codec_name]
+    for fields in _parse_encoded(data, codec_name, ignore_errors, engine):
+        index, start_ms, end_ms, content, proprietary = fields
+        if isinstance(content, bytes):
+            fields = (
+                index,
+                start_ms,
+                end_ms,
+                content.decode(codec),
+                proprietary.decode(codec),
+            )
+        yield _subtitle_from_fields(fields, integer_ms)
+
+
+def _parse_encoded(data, codec_name, ignore_errors, engine):
+    """
+    The parsing part of :py:func:`parse_bytes`, see there for the parameters.
+
+    Blocks that the bytes engine handles come out with their content and
+    proprietary metadata still encoded, so that callers only pay for
+    decoding them if they need to. Anything else is decoded to be parsed,
+    so comes out as str.
+
+    :param str codec_name: The name of a codec in BYTES_ENGINE_CODECS
+    :returns: The fields of a :py:class:`MillisecondSubtitle` for each block
+    :rtype: :term:`generator` of tuples
+    """
+    codec = BYTES_ENGINE_CODECS[codec_name]
+
+    # Decoding with utf-8-sig strips any BOM, so skip it here too
+    pos = 0
+    if codec_name == "utf-8-sig" and data[:3] == codecs.BOM_UTF8:
+        pos = 3
+
+    # Character positions are only needed for SRTParseError offsets and
+    # warnings, so we only work them out when something isn't contiguous,
+    # decoding from wherever we last worked one out
+    decoded_to = [pos, 0]
+
+    def char_pos_at(byte_pos):
+        decoded_to[1] += len(data[decoded_to[0] : byte_pos].decode(codec))
+        decoded_to[0] = byte_pos
+        return decoded_to[1]
+
+    # Where to start looking for the end of the next window, so that if it
+    # has unmatched data at the end which we need to look at again, the next
+    # window is bigger
+    min_split = 0
+
+    while pos < len(data):
+        if engine == "fast":
+            block = _match_block_bytes(data, pos)
+            if block is not None:
+                pos, fields = block
+                yield fields
+                continue
+
+        # Something the bytes engine doesn't handle, so decode from here to a
+        # safe split point and parse that the same way parse_stream does
+        split_at = next(
+            _block_boundaries(
+                data,
+                max(pos + DEFAULT_CHUNK_SIZE, min_split),
+                BLOCK_BOUNDARY_BYTES_REGEX,
+                TIMESTAMP_ARROW_BYTES_REGEX,
+            ),
+            len(data),
+        )
+        at_end = split_at == len(data)
+        window = data[pos:split_at].decode(codec)
+
+        matched_to = 0
+        for matched_to, fields in _parse_window(
+            window, ignore_errors, engine, at_end, char_pos_at, pos
+        ):
+            yield fields
+
+        if at_end:
+            return
+
+        pos += len(window[:matched_to].encode(codec))
+        min_split = split_at
+
+
+def _parse_window(window, ignore_errors, engine, at_end, char_pos_at, pos):
+    """
+    Parse a decoded window of :py:func:`parse_bytes`'s data.
+
+    :param str window: The decoded data
+    :param ignore_errors: See :py:func:`parse`
+    :param str engine: See :py:func:`parse`
+    :param bool at_end: Whether the window runs to the end of the data, in
+                        which case anything unmatched at its end is an error
+                        too
+    :param char_pos_at: Called with ``pos`` to get the character offset of
+                        the window in the whole of the data, for errors and
+                        warnings
+    :param int pos: Where the window starts in the data
+    :returns: Where each block ends in ``window``, and the fields of a
+              :py:class:`MillisecondSubtitle` for it
+    :rtype: :term:`generator` of (int, tuple)
+    """
+    expected_start = 0
+    for actual_start, actual_end, groups in _match_blocks(window, len(window), engine):
+        if actual_start != expected_start:
+            _check_contiguity(
+                window,
+                expected_start,
+                actual_start,
+                ignore_errors,
+                offset=char_pos_at(pos),
+            )
+        # pylint: disable=protected-access
+        yield actual_end, _subtitle_from_groups(groups, integer_ms=True)._astuple()
+        expected_start = actual_end
+
+    if at_end and expected_start != len(window):
+        _check_contiguity(
+            window, expected_start, len(window), ignore_errors, offset=char_pos_at(pos)
+        )
+
+
+def _match_block_bytes(data, pos):
+    """
+    The same as :py:func:`_match_block_fast`, but for undecoded data.
+
+    :param data: The data to match
+    :type data: :py:class:`mmap.mmap` or bytes
+    :param int pos: Where the block should start
+    :returns: Where the block ends, and the fields of a
+              :py:class:`MillisecondSubtitle` for it, with the content and
+              proprietary metadata still encoded, or None if we can't handle
+              this block
+    :rtype: (int, tuple) or None
+    """
+    header = FAST_HEADER_BYTES_REGEX.match(data, pos)
+    if header is None:
+        return None
+
+    content_start = header.end()
+    content_end_match = FAST_CONTENT_END_BYTES_REGEX.search(data, content_start)
+
+    if content_end_match is None:
+        block_end = len(data)
+        if block_end > content_start and data[block_end - 1 : block_end] == b"\n":
+            content_end = block_end - 1
+        else:
+            content_end = block_end
+    elif content_end_match.group() != b"\n\n":
+        return None
+    else:
+        content_end = content_end_match.start()
+        block_end = content_end + 2
+        if not FAST_NEXT_BLOCK_BYTES_REGEX.match(data, block_end):
+            return None
+
+    if (
+        content_start != content_end
+        and data[content_start : content_start + 1] == b"\n"
+    ):
+        return None
+
+    fields = header.groups()
+    return (
+        block_end,
+        (
+            int(fields[0]),
+            _timestamp_fields_to_milliseconds(*fields[1:5]),
+            _timestamp_fields_to_milliseconds(*fields[5:9]),
+            data[content_start:content_end],
+            fields[9] or b"",
+        ),
+    )
+
+
+def _timestamp_fields_to_milliseconds(hrs, mins, secs, msecs):
+    """
+    :returns: The time in milliseconds of an SRT timestamp's fields
+    :rtype: int
+    """
+    return (
+        int(hrs) * MILLISECONDS_IN_HOUR
+        + int(mins) * MILLISECONDS_IN_MINUTE
+        + int(secs) * MILLISECONDS_IN_SECOND
+        + int(msecs)
+    )
+
+
+def _check_engine(engine):
+    """
+    :raises ValueError: If ``engine`` is not one of PARSE_ENGINES
+    """
+    if engine not in PARSE_ENGINES:
+        raise ValueError(
+            "Unknown parsing engine {!r}, expected one of {!r}".format(
+                engine, PARSE_ENGINES
+            )
+        )
+
+
+def _match_blocks(srt, endpos, engine, spans=False):
+    """
+    Find the SRT blocks in ``srt[:endpos]``, the same way that
+    ``SRT_REGEX.finditer`` would.
+
+    :param str srt: The data to match
+    :param int endpos: Where to consider the data to end
+    :param str engine: The parsing engine, see :py:func:`parse`
+    :param bool spans: Whether to give the (start, end) span of the content
+                       in ``srt``, instead of slicing it out
+    :returns: The start and end of each block, and the same groups as
+              SRT_REGEX would have matched
+    :rtype: :term:`generator` of (int, int, tuple) tuples
+    """
+    if engine == "regex":
+        for match in SRT_REGEX.finditer(srt, 0, endpos):
+            yield match.start(), match.end(), _match_groups(match, spans)
+        return
+
+    pos = 0
+    while pos < endpos:
+        block = _match_block_fast(srt, pos, endpos, spans)
+
+        if block is None:
+            # Something we don't handle, like a blank line in the content or
+            # some garbage. Let the regex deal with it, and then carry on
+            # trying the fast path from where it left off.
+            match = SRT_REGEX.search(srt, pos, endpos)
+            if match is None:
+                return
+            block = match.start(), match.end(), _match_groups(match, spans)
+
+        yield block
+        pos = block[1]
+
+
+def _match_groups(match, spans):
+    """
+    :returns: The groups of a SRT_REGEX match, see :py:func:`_match_blocks`
+    :rtype: tuple
+    """
+    if spans:
+        return match.group(1, 2, 3, 4) + (match.span(5),)
+    return match.groups()
+
 
-    expected_start = 0
+def _match_block_fast(srt, pos, endpos, spans=False):
+    """
+    Match a strictly valid SRT block at ``pos`` without using SRT_REGEX. We
+    only accept a block when SRT_REGEX would have matched exactly the same
+    thing at the same place, so anything unusual (CRLF line endings, leading
+    whitespace, blank lines in the content, content lines starting with
+    something that could be an index, and so on) makes us bail out.
+
+    :param str srt: The data to match
+    :param int pos: Where the block should start
+    :param int endpos: Where to consider the data to end
+    :param bool spans: See :py:func:`_match_blocks`
+    :returns: The block's start and end, and the same groups as SRT_REGEX
+              would have matched, or None if we can't handle this block
+    :rtype: (int, int, tuple) or None
+    """
+    header = FAST_HEADER_REGEX.match(srt, pos, endpos)
+    if header is None:
+        return None
+
+    content_start = header.end()
+    content_end_match = FAST_CONTENT_END_REGEX.search(srt, content_start, endpos)
+
+    if content_end_match is None:
+        # Last block, which may or may not end with a newline
+        block_end = endpos
+        if block_end > content_start and srt[block_end - 1] == "\n":
+            content_end = block_end - 1
+        else:
+            content_end = block_end
+    elif content_end_match.group() != "\n\n":
+        return None
+    else:
+        # Content is followed by a blank line, but that only ends the block if
+        # what comes next looks like another block
+        content_end = content_end_match.start()
+        block_end = content_end + 2
+        if not FAST_NEXT_BLOCK_REGEX.match(srt, block_end, endpos):
+            return None
+
+    if content_start != content_end and srt[content_start] == "\n":
+        return None
+
+    raw_index, raw_start, raw_end, proprietary = header.groups()
+    if spans:
+        content = (content_start, content_end)
+    else:
+        content = srt[content_start:content_end]
+
+    groups = (raw_index, raw_start, raw_end, proprietary or "", content)
+    return pos, block_end, groups
+
+
+def _lazy_subtitle_from_groups(srt, groups, integer_ms):
+    """
+    Build a :py:class:`LazySubtitle` from the groups matched by SRT_REGEX,
+    with the span of the content in ``srt`` instead of the content itself.
+
+    :param str srt: The data that was matched
+    :param tuple groups: The groups, as from :py:func:`_match_blocks` with
+                         ``spans`` set
+    :param bool integer_ms: Whether to build a
+                            :py:class:`LazyMillisecondSubtitle`
+    :rtype: :py:class:`LazySubtitle` or :py:class:`LazyMillisecondSubtitle`
+    """
+    raw_index, raw_start, raw_end, proprietary, content_span = groups
+
+    if integer_ms:
+        return LazyMillisecondSubtitle(
+            _parse_raw_index(raw_index),
+            srt_timestamp_to_milliseconds(raw_start),
+            srt_timestamp_to_milliseconds(raw_end),
+            content_span,
+            proprietary,
+            source=srt,
+        )
 
-    # Transparently read files -- the whole thing is needed for regex's
-    # finditer
-    if isinstance(srt, FILE_TYPES):
-        srt = srt.read()
+    return LazySubtitle(
+        _parse_raw_index(raw_index),
+        srt_timestamp_to_timedelta(raw_start),
+        srt_timestamp_to_timedelta(raw_end),
+        content_span,
+        proprietary,
+        source=srt,
+    )
 
-    for match in SRT_REGEX.finditer(srt):
-        actual_start = match.start()
-        _check_contiguity(srt, expected_start, actual_start, ignore_errors)
-        raw_index, raw_start, raw_end, proprietary, content = match.groups()
 
-        # pytype sees that this is Optional[str] and thus complains that they
-        # can be None, but they can't realistically be None, since we're using
-        # finditer and all match groups are mandatory in the regex.
-        content = content.replace("\r\n", "\n")  # pytype: disable=attribute-error
+def _subtitle_from_groups(groups, integer_ms):
+    """
+    Build a :py:class:`Subtitle` from the groups matched by SRT_REGEX.
 
-        try:
-            raw_index = int(raw_index)
-        except ValueError:
-            # Index 123.4. Handled separately, since it's a rare case and we
-            # don't want to affect general performance.
-            #
-            # The pytype disable is for the same reason as content, above.
-            raw_index = int(raw_index.split(".")[0])  # pytype: disable=attribute-error
-        except TypeError:
-            # There's no index, so raw_index is already set to None. We'll
-            # handle this when rendering the subtitle with to_srt.
-            pass
+    :param tuple groups: The groups matched by SRT_REGEX
+    :param bool integer_ms: Whether to build a :py:class:`MillisecondSubtitle`
+    :returns: The matched subtitle
+    :rtype: :py:class:`Subtitle`
+    """
+    raw_index, raw_start, raw_end, proprietary, content = groups
 
-        yield Subtitle(
+    # pytype sees that this is Optional[str] and thus complains that they can
+    # be None, but they can't realistically be None, since all match groups
+    # other than the index are mandatory in the regex.
+    content = content.replace("\r\n", "\n")  # pytype: disable=attribute-error
+    raw_index = _parse_raw_index(raw_index)
+
+    if integer_ms:
+        return MillisecondSubtitle(
             index=raw_index,
-            start=srt_timestamp_to_timedelta(raw_start),
-            end=srt_timestamp_to_timedelta(raw_end),
+            start_ms=srt_timestamp_to_milliseconds(raw_start),
+            end_ms=srt_timestamp_to_milliseconds(raw_end),
             content=content,
             proprietary=proprietary,
         )
 
-        expected_start = match.end()
-
-    _check_contiguity(srt, expected_start, len(srt), ignore_errors)
+    return Subtitle(
+        index=raw_index,
+        start=srt_timestamp_to_timedelta(raw_start),
+        end=srt_timestamp_to_timedelta(raw_end),
+        content=content,
+        proprietary=proprietary,
+    )
 
 
-def _check_contiguity(srt, expected_start, actual_start, warn_only):
+def _parse_raw_index(raw_index):
+    """
+    :param raw_index: The index matched by SRT_REGEX
+    :type raw_index: str or None
+    :returns: The index as an int, or None if there was no index
+    :rtype: int or None
+    """
+    try:
+        return int(raw_index)
+    except ValueError:
+        # Index 123.4. Handled separately, since it's a rare case and we don't
+        # want to affect general performance.
+        #
+        # The pytype disable is because pytype thinks it may be None, which it
+        # can't be if we got a ValueError.
+        return int(raw_index.split(".")[0])  # pytype: disable=attribute-error
+    except TypeError:
+        # There's no index, so raw_index is already set to None. We'll handle
+        # this when rendering the subtitle with to_srt.
+        return None
+
+
+def _check_contiguity(srt, expected_start, actual_start, warn_only, offset=0):
     """
     If ``warn_only`` is False, raise :py:class:`SRTParseError` with diagnostic
     info if expected_start does not equal actual_start. Otherwise, log a
@@ -417,13 +2212,15 @@ def _check_contiguity(srt, expected_start, actual_start, warn_only):
                                iteration's match.end()
     :param int actual_start: The actual start, as from this iteration's
                              match.start()
+    :param int offset: The position of ``srt`` in the full input, if it is
+                       only part of it
     :raises SRTParseError: If the matches are not contiguous and ``warn_only``
                            is False
     """
     if expected_start != actual_start:
         unmatched_content = srt[expected_start:actual_start]
 
-        if expected_start == 0 and (
+        if expected_start + offset == 0 and (
             unmatched_content.isspace() or unmatched_content == "\ufeff"
         ):
             # #50: Leading whitespace has nowhere to be captured like in an
@@ -433,7 +2230,9 @@ def _check_contiguity(srt, expected_start, actual_start, warn_only):
         if warn_only:
             LOG.warning("Skipped unparseable SRT data: %r", unmatched_content)
         else:
-            raise SRTParseError(expected_start, actual_start, unmatched_content)
+            raise SRTParseError(
+                expected_start + offset, actual_start + offset, unmatched_content
+            )
 
 
 def compose(
@@ -460,7 +2259,10 @@ def compose(
     :param bool reindex: Whether to reindex subtitles based on start time
     :param int start_index: If reindexing, the index to start reindexing from
     :param bool strict: Whether to enable strict mode, see
-                        :py:func:`Subtitle.to_srt` for more information
+                        :py:func:`BaseSubtitle.to_srt` for more information. If
+                        the content is known to be legal already (for
+                        example, it was parsed and then only retimed),
+                        disabling this skips checking it.
     :param str eol: The end of line string to use (default "\\n")
     :returns: A single SRT formatted string, with each input
               :py:class:`Subtitle` represented as an SRT block
@@ -468,12 +2270,841 @@ def compose(
                           (version <=1.0.0 behaviour)
     :rtype: str
     """
+    return "".join(
+        _compose_blocks(
+            subtitles,
+            reindex=reindex,
+            start_index=start_index,
+            strict=strict,
+            eol=eol,
+            in_place=in_place,
+        )
+    )
+
+
+def compose_to(
+    subtitles,
+    fileobj,
+    reindex=True,
+    start_index=1,
+    strict=True,
+    eol=None,
+    in_place=False,
+    buffer_size=DEFAULT_CHUNK_SIZE,
+):
+    r"""
+    Like :py:func:`compose`, but write the SRT blocks to a file-like object as
+    they are generated, instead of building one string containing all of them.
+    Blocks are batched up into writes of roughly ``buffer_size`` characters.
+
+    .. doctest::
+
+        >>> from datetime import timedelta
+        >>> from io import StringIO
+        >>> start = timedelta(seconds=1)
+        >>> end = timedelta(seconds=2)
+        >>> subs = [Subtitle(index=1, start=start, end=end, content='x')]
+        >>> out = StringIO()
+        >>> compose_to(subs, out)
+        >>> out.getvalue()
+        '1\n00:00:01,000 --> 00:00:02,000\nx\n\n'
+
+    :param subtitles: The subtitles to convert to SRT blocks
+    :type subtitles: :term:`iterator` of :py:class:`Subtitle` objects
+    :param fileobj: The file-like object to write to, opened in text mode
+    :param int buffer_size: Roughly how many characters to collect before
+                            writing them to ``fileobj``
+
+    The other parameters are the same as for :py:func:`compose`.
+    """
+    blocks = _compose_blocks(
+        subtitles,
+        reindex=reindex,
+        start_index=start_index,
+        strict=strict,
+        eol=eol,
+        in_place=in_place,
+    )
+    _write_blocks(blocks, fileobj, buffer_size)
+
+
+def compose_bytes(
+    subtitles,
+    encoding="utf-8",
+    reindex=True,
+    start_index=1,
+    strict=True,
+    eol=None,
+    in_place=False,
+):
+    r"""
+    Like :py:func:`compose`, but returns the SRT blocks encoded with
+    ``encoding``. Each block is encoded as it is generated, so the output is
+    never held as one big string as well.
+
+    .. doctest::
+
+        >>> from datetime import timedelta
+        >>> start = timedelta(seconds=1)
+        >>> end = timedelta(seconds=2)
+        >>> subs = [Subtitle(index=1, start=start, end=end, content='x')]
+        >>> compose_bytes(subs) == b'1\n00:00:01,000 --> 00:00:02,000\nx\n\n'
+        True
+
+    :param str encoding: The encoding to use
+
+    The other parameters are the same as for :py:func:`compose`.
+
+    :rtype: bytes
+    """
+    blocks = _compose_blocks(
+        subtitles,
+        reindex=reindex,
+        start_index=start_index,
+        strict=strict,
+        eol=eol,
+        in_place=in_place,
+    )
+    return b"".join(_encode_blocks(blocks, encoding))
+
+
+def _encode_blocks(blocks, encoding):
+    """
+    Encode strings one at a time, such that joining the results is the same
+    as joining the strings and then encoding them.
+
+    :rtype: :term:`generator` of bytes
+    """
+    # An incremental encoder only writes things like UTF-16's BOM once
+    encode = codecs.getincrementalencoder(encoding)().encode
+
+    for block in blocks:
+        yield encode(block)
+
+    yield encode("", True)
+
+
+def _write_blocks(blocks, fileobj, buffer_size, joiner=""):
+    """
+    Write strings (or bytes, with a ``joiner`` of b"") to ``fileobj`` in
+    batches of roughly ``buffer_size`` characters.
+    """
+    pending = []
+    pending_size = 0
+
+    for block in blocks:
+        pending.append(block)
+        pending_size += len(block)
+
+        if pending_size >= buffer_size:
+            fileobj.write(joiner.join(pending))
+            pending = []
+            pending_size = 0
+
+    if pending:
+        fileobj.write(joiner.join(pending))
+
+
+def _compose_blocks(subtitles, reindex, start_index, strict, eol, in_place):
+    """
+    Generate the SRT block for each subtitle, see :py:func:`compose` for the
+    parameters.
+
+    :rtype: :term:`generator` of str
+    """
     if reindex:
-        subtitles = sort_and_reindex(
-            subtitles, start_index=start_index, in_place=in_place
+        subtitles = _sorted_subtitles(subtitles)
+
+        if not in_place and all(
+            _defining_class(subtitle_type, "to_srt") is BaseSubtitle
+            for subtitle_type in set(map(type, subtitles))
+        ):
+            # Rather than copying every subtitle to give it its new index, as
+            # sort_and_reindex has to, write the new index in its place
+            numbered = _number_subtitles(subtitles, start_index, skip=True)
+            for index, subtitle in numbered:
+                # pylint: disable=protected-access
+                yield subtitle._to_srt(index, strict, eol)
+            return
+
+        subtitles = _reindex(subtitles, start_index, in_place, skip=True)
+
+    for subtitle in subtitles:
+        yield subtitle.to_srt(strict=strict, eol=eol)
+
+
+# Each column is an attribute of its own, since working on them directly is
+# the point of a table, so it has more than pylint would like
+class SubtitleTable(object):  # pylint: disable=R0902
+    r'''
+    A column oriented collection of subtitles, for when you want to work with
+    a lot of them at once. Rather than one :py:class:`Subtitle` object per
+    subtitle, indexes and times (in milliseconds) are stored in
+    :py:class:`array.array` columns, and content and proprietary metadata are
+    stored as references into a pool of strings, so that repeated content is
+    only stored once.
+
+    Operations on times are done a column at a time, and you can compose a
+    table to SRT with the same rules as :py:func:`compose`, so you often don't
+    need to create any :py:class:`Subtitle` objects at all.
+
+    .. doctest::
+
+        >>> table = SubtitleTable.from_srt("""\
+        ... 1
+        ... 00:00:01,000 --> 00:00:02,000
+        ... Hello
+        ...
+        ... """)
+        >>> table.shift(1500)
+        >>> table.compose()
+        '1\n00:00:02,500 --> 00:00:03,500\nHello\n\n'
+
+    Indexes must fit in a signed 64-bit integer (on Python 2, a C long, see
+    ``ARRAY_TYPECODE``), and a missing index is stored as 0, which is
+    how it would be written out anyway. Indexing or iterating over a table
+    gives :py:class:`MillisecondSubtitle` objects, created on demand.
+
+    :ivar index: The index column
+    :ivar start_ms: The start time column, in milliseconds
+    :ivar end_ms: The end time column, in milliseconds
+    :ivar content_id: The position of each subtitle's content in ``strings``
+    :ivar proprietary_id: The position of each subtitle's proprietary
+                          metadata in ``strings``
+    :ivar strings: The string pool
+    :ivar encoding: The codec the strings in the pool are encoded with, if the
+                    table came from :py:meth:`from_bytes`, or None if they are
+                    str
+    '''
+
+    def __init__(self):
+        self.index = array(ARRAY_TYPECODE)
+        self.start_ms = array(ARRAY_TYPECODE)
+        self.end_ms = array(ARRAY_TYPECODE)
+        self.content_id = array(ARRAY_TYPECODE)
+        self.proprietary_id = array(ARRAY_TYPECODE)
+        self.strings = []
+        self._string_ids = {}
+        self.encoding = None
+
+    @classmethod
+    def from_srt(cls, srt, ignore_errors=False, engine="fast"):
+        """
+        Parse SRT data straight into a new table, without creating
+        :py:class:`Subtitle` objects along the way.
+
+        The parameters are the same as for :py:func:`parse`.
+
+        :rtype: :py:class:`SubtitleTable`
+        """
+        table = cls()
+        table._extend(  # pylint: disable=W0212
+            (
+                _parse_raw_index(raw_index),
+                srt_timestamp_to_milliseconds(raw_start),
+                srt_timestamp_to_milliseconds(raw_end),
+                content.replace("\r\n", "\n"),
+                proprietary,
+            )
+            for raw_index, raw_start, raw_end, proprietary, content in _parse_groups(
+                srt, ignore_errors, engine
+            )
+        )
+        return table
+
+    @classmethod
+    def from_bytes(cls, data, encoding="utf-8", ignore_errors=False, engine="fast"):
+        """
+        Like :py:meth:`from_srt`, but takes encoded SRT data, which is parsed
+        as with :py:func:`parse_bytes`.
+
+        For UTF-8 and ASCII, the content and proprietary metadata of strictly
+        valid blocks go into the string pool without being decoded, so that
+        :py:meth:`compose_bytes` can write them back out in the same encoding
+        without ever decoding them. This also means that they aren't checked
+        to be valid in ``encoding``. Other encodings are decoded in full and
+        parsed with :py:meth:`from_srt`.
+
+        :param bytes data: The encoded SRT data
+        :param str encoding: The encoding of ``data``
+
+        The other parameters are the same as for :py:func:`parse`.
+
+        :rtype: :py:class:`SubtitleTable`
+        """
+        _check_engine(engine)
+        codec_name = codecs.lookup(encoding).name
+
+        if codec_name not in BYTES_ENGINE_CODECS:
+            return cls.from_srt(codecs.decode(data, encoding), ignore_errors, engine)
+
+        table = cls()
+        codec = table.encoding = BYTES_ENGINE_CODECS[codec_name]
+        table._extend(  # pylint: disable=W0212
+            (
+                fields
+                if isinstance(fields[3], bytes)
+                else fields[:3] + (fields[3].encode(codec), fields[4].encode(codec))
+            )
+            for fields in _parse_encoded(data, codec_name, ignore_errors, engine)
+        )
+        return table
+
+    @classmethod
+    def from_subtitles(cls, subtitles):
+        """
+        Create a new table from :py:class:`Subtitle` objects. Times are
+        truncated to the millisecond.
+
+        :param subtitles: :py:class:`Subtitle` objects in any order
+        :rtype: :py:class:`SubtitleTable`
+        """
+        table = cls()
+        for subtitle in subtitles:
+            if isinstance(subtitle, MillisecondSubtitle):
+                start_ms, end_ms = subtitle.start_ms, subtitle.end_ms
+            else:
+                start_ms = timedelta_to_milliseconds(subtitle.start)
+                end_ms = timedelta_to_milliseconds(subtitle.end)
+            table.append(
+                subtitle.index,
+                start_ms,
+                end_ms,
+                subtitle.content,
+                subtitle.proprietary,
+            )
+        return table
+
+    def _extend(self, rows):
+        """
+        Add subtitles to the end of the table, given the fields of a
+        :py:class:`MillisecondSubtitle` for each, with content and proprietary
+        metadata already in the same form as the string pool.
+        """
+        # Appending to the columns directly is noticeably faster than calling
+        # append() for every row on large inputs
+        intern = self._intern
+        add_index = self.index.append
+        add_start = self.start_ms.append
+        add_end = self.end_ms.append
+        add_content = self.content_id.append
+        add_proprietary = self.proprietary_id.append
+
+        for index, start_ms, end_ms, content, proprietary in rows:
+            add_index(index or 0)
+            add_start(start_ms)
+            add_end(end_ms)
+            add_content(intern(content))
+            add_proprietary(intern(proprietary))
+
+    def append(self, index, start_ms, end_ms, content, proprietary=""):
+        """
+        Add a subtitle to the end of the table. The parameters are the same
+        as for :py:class:`MillisecondSubtitle`.
+        """
+        if self.encoding is not None:
+            content = content.encode(self.encoding)
+            proprietary = proprietary.encode(self.encoding)
+        self.index.append(index or 0)
+        self.start_ms.append(start_ms)
+        self.end_ms.append(end_ms)
+        self.content_id.append(self._intern(content))
+        self.proprietary_id.append(self._intern(proprietary))
+
+    def _intern(self, string):
+        """
+        :returns: The position of ``string`` in the string pool, adding it if
+                  needed
+        :rtype: int
+        """
+        try:
+            return self._string_ids[string]
+        except KeyError:
+            string_id = len(self.strings)
+            self.strings.append(string)
+            self._string_ids[string] = string_id
+            return string_id
+
+    def __len__(self):
+        return len(self.index)
+
+    def _is_blank(self, string_id):
+        """
+        :returns: Whether a string in the pool is empty or only whitespace
+        :rtype: bool
+        """
+        string = self.strings[string_id]
+        if self.encoding is None:
+            return not string.strip()
+
+        # Stripping bytes only strips ASCII whitespace, but if what's left
+        # starts with a printable ASCII character, that's enough to know
+        # without decoding
+        first = string.strip()[:1]
+        if b"\x1f" < first < b"\x7f":
+            return False
+        return not string.decode(self.encoding, "replace").strip()
+
+    def _decoded_strings(self):
+        """
+        :returns: The string pool as str
+        :rtype: list of str
+        """
+        if self.encoding is None:
+            return self.strings
+        return [string.decode(self.encoding) for string in self.strings]
+
+    def __getitem__(self, pos):
+        content = self.strings[self.content_id[pos]]
+        proprietary = self.strings[self.proprietary_id[pos]]
+        if self.encoding is not None:
+            content = content.decode(self.encoding)
+            proprietary = proprietary.decode(self.encoding)
+
+        return MillisecondSubtitle(
+            index=self.index[pos],
+            start_ms=self.start_ms[pos],
+            end_ms=self.end_ms[pos],
+            content=content,
+            proprietary=proprietary,
+        )
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self[pos]
+
+    def shift(self, milliseconds):
+        """
+        Move all start and end times by the same amount, in place.
+
+        :param int milliseconds: How far to shift, which may be negative
+        """
+        self.start_ms = array(
+            ARRAY_TYPECODE, [ms + milliseconds for ms in self.start_ms]
+        )
+        self.end_ms = array(ARRAY_TYPECODE, [ms + milliseconds for ms in self.end_ms])
+
+    def scale(self, factor):
+        """
+        Multiply all start and end times by ``factor``, in place, rounding to
+        the nearest millisecond.
+
+        :param float factor: The factor to scale by
+        """
+        self.start_ms = array(
+            ARRAY_TYPECODE, [int(round(ms * factor)) for ms in self.start_ms]
+        )
+        self.end_ms = array(
+            ARRAY_TYPECODE, [int(round(ms * factor)) for ms in self.end_ms]
+        )
+
+    def sorted_positions(self):
+        """
+        :returns: The positions of the subtitles in the table, in the order
+                  that :py:func:`sort_and_reindex` would sort them in
+        :rtype: list of int
+        """
+        keys = zip(self.start_ms, self.end_ms, self.index, range(len(self)))
+        return [key[-1] for key in sorted(keys)]
+
+    def sort(self):
+        """
+        Sort the table in place, in the same order as
+        :py:func:`sort_and_reindex` would.
+        """
+        self._take(self.sorted_positions())
+
+    def filter(self, keep):
+        """
+        Make a new table with only some of the subtitles in this one. The
+        string pool is shared between the two tables.
+
+        .. doctest::
+
+            >>> table = SubtitleTable()
+            >>> table.append(1, -1000, 1000, 'early')
+            >>> table.append(2, 1000, 2000, 'ok')
+            >>> later = table.filter(start >= 0 for start in table.start_ms)
+            >>> [sub.content for sub in later]
+            ['ok']
+
+        :param keep: One truthy value for each subtitle that should be kept,
+                     or falsy value for each that shouldn't, in table order
+        :rtype: :py:class:`SubtitleTable`
+        """
+        table = type(self)()
+        table.index = self.index
+        table.start_ms = self.start_ms
+        table.end_ms = self.end_ms
+        table.content_id = self.content_id
+        table.proprietary_id = self.proprietary_id
+        table.strings = self.strings
+        table.encoding = self.encoding
+        # pylint: disable=W0212
+        table._string_ids = self._string_ids
+        table._take([pos for pos, kept in zip(range(len(self)), keep) if kept])
+        return table
+
+    def _take(self, positions):
+        """
+        Replace every column with just the rows at ``positions``, in that
+        order.
+        """
+        for column in ("index", "start_ms", "end_ms", "content_id", "proprietary_id"):
+            values = getattr(self, column)
+            setattr(
+                self, column, array(ARRAY_TYPECODE, [values[pos] for pos in positions])
+            )
+
+    def compose(self, reindex=True, start_index=1, strict=True, eol=None):
+        r"""
+        Convert the table to a string of joined SRT blocks. The parameters are
+        the same as for :py:func:`compose`.
+
+        :rtype: str
+        """
+        return "".join(self._compose_blocks(reindex, start_index, strict, eol))
+
+    def compose_to(
+        self,
+        fileobj,
+        reindex=True,
+        start_index=1,
+        strict=True,
+        eol=None,
+        buffer_size=DEFAULT_CHUNK_SIZE,
+        encoding=None,
+    ):
+        """
+        Write the table to a file-like object as SRT blocks. The parameters
+        are the same as for :py:func:`compose_to`, except for:
+
+        :param str encoding: If given, ``fileobj`` should be opened in binary
+                             mode, and the blocks are written encoded, as
+                             with :py:meth:`compose_bytes`
+        """
+        if encoding is None:
+            blocks = self._compose_blocks(reindex, start_index, strict, eol)
+            _write_blocks(blocks, fileobj, buffer_size)
+        else:
+            blocks = self._compose_encoded_blocks(
+                encoding, reindex, start_index, strict, eol
+            )
+            _write_blocks(blocks, fileobj, buffer_size, joiner=b"")
+
+    def compose_bytes(
+        self, encoding="utf-8", reindex=True, start_index=1, strict=True, eol=None
+    ):
+        r"""
+        Convert the table to SRT blocks encoded with ``encoding``. The
+        parameters are the same as for :py:func:`compose_bytes`.
+
+        If the table came from :py:meth:`from_bytes` with data in the same
+        encoding, content and proprietary metadata are copied to the output
+        as they are, without being decoded or encoded.
+
+        .. doctest::
+
+            >>> table = SubtitleTable.from_bytes(
+            ...     b'1\n00:00:01,000 --> 00:00:02,000\nCaf\xc3\xa9\n\n'
+            ... )
+            >>> table.shift(1000)
+            >>> table.compose_bytes() == (
+            ...     b'1\n00:00:02,000 --> 00:00:03,000\nCaf\xc3\xa9\n\n'
+            ... )
+            True
+
+        :rtype: bytes
+        """
+        return b"".join(
+            self._compose_encoded_blocks(encoding, reindex, start_index, strict, eol)
+        )
+
+    def _compose_encoded_blocks(self, encoding, reindex, start_index, strict, eol):
+        """
+        Generate the SRT block for each subtitle encoded with ``encoding``,
+        with the same rules as :py:func:`compose`.
+
+        :rtype: :term:`generator` of bytes
+        """
+        if self.encoding is None or codecs.lookup(encoding).name != self.encoding:
+            blocks = self._compose_blocks(reindex, start_index, strict, eol)
+            for block in _encode_blocks(blocks, encoding):
+                yield block
+            return
+
+        codec = self.encoding
+        strings = self.strings
+        if eol is None:
+            eol = "\n"
+        eol_bytes = eol.encode(codec)
+
+        for index, pos in self._numbered_positions(reindex, start_index):
+            content = strings[self.content_id[pos]]
+            proprietary = strings[self.proprietary_id[pos]]
+
+            if proprietary:
+                proprietary = b" " + proprietary
+            if strict:
+                content = _make_legal_content_bytes(content, codec)
+            if eol != "\n":
+                content = content.replace(b"\n", eol_bytes)
+
+            # Timestamps are ASCII, so they're the same in any encoding that
+            # the bytes engine handles
+            yield (
+                b"%d%s%s --> %s%s%s%s%s%s"
+                % (
+                    index or 0,
+                    eol_bytes,
+                    milliseconds_to_srt_timestamp(self.start_ms[pos]).encode("ascii"),
+                    milliseconds_to_srt_timestamp(self.end_ms[pos]).encode("ascii"),
+                    proprietary,
+                    eol_bytes,
+                    content,
+                    eol_bytes,
+                    eol_bytes,
+                )
+            )
+
+    def _compose_blocks(self, reindex, start_index, strict, eol):
+        """
+        Generate the SRT block for each subtitle, with the same rules as
+        :py:func:`compose`.
+
+        :rtype: :term:`generator` of str
+        """
+        strings = self._decoded_strings()
+
+        for index, pos in self._numbered_positions(reindex, start_index):
+            yield _format_srt_block(
+                index,
+                milliseconds_to_srt_timestamp(self.start_ms[pos]),
+                milliseconds_to_srt_timestamp(self.end_ms[pos]),
+                strings[self.content_id[pos]],
+                strings[self.proprietary_id[pos]],
+                strict,
+                eol,
+            )
+
+    def _numbered_positions(self, reindex, start_index):
+        """
+        Work out which subtitles to compose and in what order, and the index
+        to write for each, with the same rules as :py:func:`compose`.
+
+        :returns: The index and position of each subtitle to compose
+        :rtype: :term:`generator` of (int, int) tuples
+        """
+        if reindex:
+            positions = self.sorted_positions()
+        else:
+            positions = range(len(self))
+
+        sub_num = start_index
+        for pos in positions:
+            if reindex:
+                skip_reason = self._skip_reason(pos)
+                if skip_reason:
+                    LOG.info(
+                        "Skipped subtitle at index %d: %s", self.index[pos], skip_reason
+                    )
+                    continue
+                index = sub_num
+                sub_num += 1
+            else:
+                index = self.index[pos]
+
+            yield index, pos
+
+    def _skip_reason(self, pos):
+        """
+        Check if the subtitle at ``pos`` should be skipped when composing,
+        with the same rules as SUBTITLE_SKIP_CONDITIONS.
+
+        :returns: Why the subtitle should be skipped, or None
+        :rtype: str
+        """
+        return _skip_reason(
+            self._is_blank(self.content_id[pos]),
+            self.start_ms[pos],
+            self.end_ms[pos],
+            0,
+        )
+
+
+class SubtitleIndex(object):
+    r'''
+    An index of when subtitles are on screen, to find the ones showing at a
+    given time, during a range of time, or at the same time as each other,
+    without looking at all of them.
+
+    Subtitles are on screen from their start time up to, but not including,
+    their end time. So a subtitle ending as another starts doesn't overlap it,
+    and subtitles which end before or as they start are never on screen, and
+    aren't indexed at all.
+
+    .. doctest::
+
+        >>> from datetime import timedelta
+        >>> index = SubtitleIndex(parse("""\
+        ... 1
+        ... 00:00:01,000 --> 00:00:04,000
+        ... Hello
+        ...
+        ... 2
+        ... 00:00:03,000 --> 00:00:05,000
+        ... world
+        ...
+        ... """))
+        >>> [sub.content for sub in index.at(timedelta(seconds=2))]
+        ['Hello']
+        >>> [(a.index, b.index) for a, b in index.overlaps()]
+        [(1, 2)]
+
+    The index is an interval tree, stored implicitly in the order of the
+    subtitles' start times, with each node holding the latest end time in its
+    subtree (the layout used by `cgranges <https://github.com/lh3/cgranges>`_).
+    Queries take O(log n + k) time for k results (and finding all overlapping
+    pairs takes O(n + k)), and the index takes little memory beyond a list of
+    the subtitles. Subtitles shouldn't be retimed once they are indexed.
+
+    :param subtitles: :py:class:`Subtitle` objects in any order
+    :ivar subtitles: The indexed subtitles, sorted by start time
+    '''
+
+    def __init__(self, subtitles):
+        self.subtitles = sorted(
+            (subtitle for subtitle in subtitles if subtitle.start < subtitle.end),
+            key=operator.attrgetter("start"),
         )
+        self._starts = [subtitle.start for subtitle in self.subtitles]
+        self._ends = [subtitle.end for subtitle in self.subtitles]
+        self._max_ends = list(self._ends)
+        self._root_level = self._build()
+
+    def _build(self):
+        """
+        Set each node's entry in ``_max_ends`` to the latest end time in its
+        subtree.
+
+        Each position in the sorted subtitles is a node, at the level given by
+        how many trailing 1 bits the position has, and its children are ``2 **
+        (level - 1)`` positions either side of it. Nodes near the end of the
+        list may be missing children, which are stood in for by the rightmost
+        subtree that does exist.
 
-    return "".join(subtitle.to_srt(strict=strict, eol=eol) for subtitle in subtitles)
+        :returns: The level of the root node
+        :rtype: int
+        """
+        count = len(self._max_ends)
+        max_ends = self._max_ends
+
+        # The rightmost node (and its latest end time) at the current level
+        last_pos = (count - 1) & ~1
+        last_max_end = max_ends[last_pos] if count else None
+
+        level = 1
+        while 1 << level <= count:
+            half = 1 << (level - 1)
+            for pos in range(2 * half - 1, count, 4 * half):
+                right = max_ends[pos + half] if pos + half < count else last_max_end
+                max_ends[pos] = max(max_ends[pos], max_ends[pos - half], right)
+
+            if last_pos >> level & 1:
+                last_pos -= half
+            else:
+                last_pos += half
+            if last_pos < count:
+                last_max_end = max(last_max_end, max_ends[last_pos])
+
+            level += 1
+
+        return level - 1
+
+    def __len__(self):
+        return len(self.subtitles)
+
+    def __iter__(self):
+        return iter(self.subtitles)
+
+    def _overlapping_positions(self, start, end):
+        """
+        Find the positions of the subtitles on screen at any time from
+        ``start`` up to ``end``.
+
+        :returns: The positions, in order
+        :rtype: list of int
+        """
+        starts, ends, max_ends = self._starts, self._ends, self._max_ends
+        count = len(starts)
+        positions = []
+
+        # Walk the tree in order, with a stack of (level, position, whether
+        # the left subtree has been walked yet)
+        stack = [(self._root_level, (1 << self._root_level) - 1, False)]
+        while stack:
+            level, pos, left_walked = stack.pop()
+            if level <= INDEX_SCAN_LEVEL:
+                first_pos = pos >> level << level
+                for scan_pos in range(first_pos, min(pos + (1 << level), count)):
+                    if starts[scan_pos] >= end:
+                        break
+                    if start < ends[scan_pos]:
+                        positions.append(scan_pos)
+            elif not left_walked:
+                stack.append((level, pos, True))
+                left_pos = pos - (1 << (level - 1))
+                if left_pos >= count or max_ends[left_pos] > start:
+                    stack.append((level - 1, left_pos, False))
+            elif pos < count and starts[pos] < end:
+                if start < ends[pos]:
+                    positions.append(pos)
+                stack.append((level - 1, pos + (1 << (level - 1)), False))
+
+        return positions
+
+    def overlapping(self, start, end):
+        """
+        Find the subtitles on screen at any time from ``start`` up to, but not
+        including, ``end``.
+
+        :param datetime.timedelta start: The start of the range
+        :param datetime.timedelta end: The end of the range
+        :returns: The subtitles, sorted by start time
+        :rtype: list of :py:class:`Subtitle`
+        """
+        if not self.subtitles or start >= end:
+            return []
+        return [self.subtitles[pos] for pos in self._overlapping_positions(start, end)]
+
+    def at(self, time):
+        """
+        Find the subtitles on screen at ``time``.
+
+        :param datetime.timedelta time: The time to look at
+        :returns: The subtitles, sorted by start time
+        :rtype: list of :py:class:`Subtitle`
+        """
+        # timedelta has microsecond resolution, so this range only contains
+        # ``time``
+        return self.overlapping(time, time + timedelta(microseconds=1))
+
+    def overlaps(self):
+        """
+        Find the pairs of subtitles which are on screen at the same time as
+        each other.
+
+        :returns: Each pair, in the order of :py:attr:`subtitles`
+        :rtype: :term:`generator` of tuple of :py:class:`Subtitle`
+        """
+        # Since every indexed subtitle ends after it starts, subtitles starting
+        # after one starts overlap it exactly when they start before it ends
+        starts = self._starts
+        for pos, subtitle in enumerate(self.subtitles):
+            other_pos = pos + 1
+            while other_pos < len(starts) and starts[other_pos] < subtitle.end:
+                yield subtitle, self.subtitles[other_pos]
+                other_pos += 1
 
 
 class SRTParseError(Exception):
@@ -505,6 +3136,26 @@ class TimestampParseError(ValueError):
     """
 
 
+class SubtitleOrderError(ValueError):
+    """
+    Raised when a subtitle comes after others that it should be sorted
+    before, and they have already been yielded.
+
+    :param subtitle: The subtitle that was out of order
+    :param int window: How many subtitles out of order it could have been
+    """
+
+    def __init__(self, subtitle, window):
+        message = (
+            "Subtitle at index %s is more than %d subtitles out of order, try "
+            "a larger window" % (subtitle.index, window)
+        )
+        super(SubtitleOrderError, self).__init__(message)
+
+        self.subtitle = subtitle
+        self.window = window
+
+
 class _ShouldSkipException(Exception):
     """
     Raised when a subtitle should be skipped.
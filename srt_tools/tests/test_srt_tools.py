@@ -1,9 +1,20 @@
 #!/usr/bin/env python
 
+import contextlib
+import functools
 import os
+import runpy
+import shutil
 import subprocess
 import sys
 import tempfile
+from array import array
+from datetime import timedelta
+
+import pytest
+
+import srt
+import srt_tools.utils
 
 try:
     from shlex import quote
@@ -38,6 +49,39 @@ def windows_crappy_quote(data):
     return '"' + data + '"'
 
 
+@contextlib.contextmanager
+def temp_file(data):
+    """
+    A temporary file containing the text ``data``, removed afterwards.
+    """
+    fd, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, "w") as temp_f:
+            temp_f.write(data)
+        yield path
+    finally:
+        os.remove(path)
+
+
+def temp_srt_file(blocks):
+    """
+    A temporary SRT file with a block for each (index, start, end, content)
+    in ``blocks``, where the times are in seconds. See :py:func:`temp_file`.
+    """
+    return temp_file(
+        "".join(
+            "%d\n%s --> %s\n%s\n\n"
+            % (
+                index,
+                srt.timedelta_to_srt_timestamp(timedelta(seconds=start)),
+                srt.timedelta_to_srt_timestamp(timedelta(seconds=end)),
+                content,
+            )
+            for index, start, end, content in blocks
+        )
+    )
+
+
 def assert_supports_all_io_methods(cmd, exclude_output=False, exclude_stdin=False):
     # TODO: pytype doesn't like the mixed types in the matrix, but this works
     # fine. Maybe it would be happier with a namedtuple?
@@ -89,6 +133,7 @@ def assert_supports_all_io_methods(cmd, exclude_output=False, exclude_stdin=Fals
 def test_tools_support():
     matrix = [
         (["srt-normalise"], False),
+        (["srt-normalise", "--sort-window", "0"], False),
         (["srt-deduplicate"], False),
         (["srt-fixed-timeshift", "--seconds", "5"], False),
         (
@@ -105,13 +150,361 @@ def test_tools_support():
             ],
             False,
         ),
+        (
+            [
+                "srt-linear-timeshift",
+                "--anchor",
+                "00:00:00,000",
+                "00:00:00,000",
+                "--anchor",
+                "00:00:05,000",
+                "00:00:05,000",
+                "--anchor",
+                "00:00:05,001",
+                "00:00:07,001",
+            ],
+            False,
+        ),
         (["srt-lines-matching", "-f", "lambda x: True"], False),
         (["srt-process", "-f", "lambda x: x"], False),
         (["srt-mux"], False, True),
         (["srt-mux", "-t"], False, True),
-        # Need to sort out time/thread issues
+        (["srt-at", "00:00:30,000"], False),
+        (["srt-at", "00:00:30,000", "--until", "00:01:00,000"], False),
+        (["srt-overlaps"], True),
+        # Plays in real time, see test_play_prints_in_time_order instead
         # (('srt-play'), True),
     ]
 
     for args in matrix:
         assert_supports_all_io_methods(*args)
+
+
+def test_sort_window():
+    # 2 is one subtitle out of order
+    blocks = [(num, num, num + 0.5, num) for num in [1, 3, 2, 4]]
+
+    with temp_srt_file(blocks) as in_file:
+        cmd = [sys.executable, "srt_tools/srt-normalise", "-i", in_file]
+        sorted_out = run_srt_util(cmd)
+        assert run_srt_util(cmd + ["--sort-window", "1"]) == sorted_out
+        with pytest.raises(subprocess.CalledProcessError):
+            run_srt_util(cmd + ["--sort-window", "0"])
+
+        # The input is read before being overwritten in place
+        run_srt_util(cmd + ["--inplace", "--sort-window", "1"])
+        with open(in_file) as in_f:
+            assert in_f.read().replace(os.linesep, "\n") == sorted_out.replace(
+                os.linesep, "\n"
+            )
+
+    assert [sub.content for sub in srt.parse(sorted_out)] == ["1", "2", "3", "4"]
+
+
+def test_linear_timeshift_anchors_file():
+    anchors = (
+        "# from to\n00:00:00,000 00:00:00,000\n\n"
+        "00:00:05,000 00:00:05,000\n00:00:05,001 00:00:07,001\n"
+        "00:01:00,000 00:01:02,000\n"
+    )
+
+    cmd = [sys.executable, "srt_tools/srt-linear-timeshift"]
+    in_file = os.path.join(sample_dir, "ascii.srt")
+    with temp_file(anchors) as anchors_file:
+        from_file = run_srt_util(cmd + ["--anchors-file", anchors_file, "-i", in_file])
+
+    from_fixed = run_srt_util(
+        [sys.executable, "srt_tools/srt-fixed-timeshift", "--seconds", "2"]
+        + ["-i", in_file]
+    )
+    assert from_file == from_fixed
+
+
+def test_deduplicate_keeps_first_of_each_duplicate():
+    blocks = [
+        (sub_num, secs, secs + 0.5, content)
+        for sub_num, (secs, content) in enumerate(
+            [(0, "b"), (1, "a"), (2, "b"), (3, "a"), (4, "c"), (9, "a")], start=1
+        )
+    ]
+
+    with temp_srt_file(blocks) as in_file:
+        cmd = [sys.executable, "srt_tools/srt-deduplicate", "-i", in_file]
+        output = run_srt_util(cmd + ["-t", "5000"])
+        assert [sub.content for sub in srt.parse(output)] == ["b", "a", "c", "a"]
+        output = run_srt_util(cmd + ["-t", "0"])
+        assert [sub.content for sub in srt.parse(output)] == ["b", "a", "c"]
+
+
+def test_deduplicate_normalised_and_similar():
+    blocks = [
+        (sub_num, secs, secs + 0.5, content)
+        for sub_num, (secs, content) in enumerate(
+            [
+                (0, "Hello there"),
+                (1, "<i>hello</i>   THERE"),
+                (2, "{\\an8}Hello there!"),
+                (3, "Something else"),
+            ],
+            start=1,
+        )
+    ]
+
+    with temp_srt_file(blocks) as in_file:
+        cmd = [sys.executable, "srt_tools/srt-deduplicate", "-i", in_file]
+        output = run_srt_util(cmd)
+        assert len(list(srt.parse(output))) == 4
+        output = run_srt_util(cmd + ["-n"])
+        assert len(list(srt.parse(output))) == 3
+        output = run_srt_util(cmd + ["-s", "0.8"])
+        assert [sub.content for sub in srt.parse(output)] == [
+            "Hello there",
+            "Something else",
+        ]
+
+
+def test_overlaps_lists_each_pair():
+    blocks = [
+        (sub_num, start, end, "x")
+        for sub_num, (start, end) in enumerate([(1, 4), (3, 5), (5, 6), (2, 9)], 1)
+    ]
+
+    with temp_srt_file(blocks) as in_file:
+        output = run_srt_util([sys.executable, "srt_tools/srt-overlaps", "-i", in_file])
+
+    assert output.splitlines() == [
+        "1 (00:00:01,000 --> 00:00:04,000) overlaps 4 (00:00:02,000 --> 00:00:09,000)",
+        "1 (00:00:01,000 --> 00:00:04,000) overlaps 2 (00:00:03,000 --> 00:00:05,000)",
+        "4 (00:00:02,000 --> 00:00:09,000) overlaps 2 (00:00:03,000 --> 00:00:05,000)",
+        "4 (00:00:02,000 --> 00:00:09,000) overlaps 3 (00:00:05,000 --> 00:00:06,000)",
+    ]
+
+
+def test_at_keeps_original_indexes():
+    blocks = [
+        (sub_num, start, end, sub_num)
+        for sub_num, (start, end) in enumerate([(1, 4), (3, 5), (5, 6), (2, 9)], 1)
+    ]
+
+    with temp_srt_file(blocks) as in_file:
+        cmd = [sys.executable, "srt_tools/srt-at", "-i", in_file]
+        at_output = run_srt_util(cmd + ["00:00:05,500"])
+        until_output = run_srt_util(cmd + ["00:00:03,500", "--until", "00:00:05,500"])
+
+    assert [sub.index for sub in srt.parse(at_output)] == [4, 3]
+    assert [sub.index for sub in srt.parse(until_output)] == [1, 4, 2, 3]
+
+
+def test_play_prints_in_time_order():
+    # 2 and 3 overlap 1, and 3 starts as 2 ends
+    blocks = [
+        (sub_num, start, end, sub_num)
+        for sub_num, (start, end) in enumerate([(0, 0.4), (0.1, 0.2), (0.2, 0.3)], 1)
+    ]
+
+    with temp_srt_file(blocks) as in_file:
+        cmd = [sys.executable, "srt_tools/srt-play", "-i", in_file]
+        printed = run_srt_util(cmd)
+        cleared = run_srt_util(cmd + ["--clear"])
+
+    assert printed.split() == ["1", "2", "3"]
+    screens = [screen.split() for screen in cleared.split("\033[H\033[2J")]
+    assert screens == [[], ["1"], ["1", "2"], ["1", "3"], ["1"], []]
+
+
+def test_play_seeks_and_changes_speed():
+    blocks = [
+        (sub_num, start, end, sub_num)
+        for sub_num, (start, end) in enumerate([(10, 12), (20, 25), (30, 31)], 1)
+    ]
+    # 2 is on screen at 21s, so should be shown straight away
+    commands = "pause\nseek 00:00:21,000\nnot a command\nspeed 100\n"
+
+    with temp_srt_file(blocks) as in_file, temp_file(commands) as control_file:
+        cmd = [sys.executable, "srt_tools/srt-play", "-i", in_file]
+        started = run_srt_util(cmd + ["--start-at", "00:00:21,000", "--speed", "100"])
+        controlled = run_srt_util(cmd + ["--control", control_file])
+
+    assert started.split() == ["2", "3"]
+    assert controlled.split() == ["2", "3"]
+
+
+def test_mux_matches_times_across_inputs():
+    top_blocks = [(1, 1, 3, "a1"), (2, 5, 7, "a2")]
+    # The second input isn't in start time order
+    bottom_blocks = [(1, 1.2, 3.3, "b1"), (2, 6, 6.5, "b2"), (3, 4, 8, "b3")]
+
+    with temp_srt_file(top_blocks) as top_file:
+        cmd = [sys.executable, "srt_tools/srt-mux", "-i", top_file]
+        with temp_srt_file(bottom_blocks) as bottom_file:
+            output = run_srt_util(cmd + ["-i", bottom_file])
+            unmatched = run_srt_util(cmd + ["-i", bottom_file, "--ms", "0"])
+        # An empty input adds nothing, even when it's the only one
+        with temp_file("") as empty_file:
+            assert run_srt_util(cmd + ["-i", empty_file]) == run_srt_util(cmd)
+            assert run_srt_util(cmd[:2] + ["-i", empty_file]) == ""
+
+    # Subtitles within 600ms of each other share start and end times, and
+    # ties stay in input order
+    assert [
+        (sub.content, sub.start.total_seconds(), sub.end.total_seconds())
+        for sub in srt.parse(output)
+    ] == [
+        ("a1", 1, 3),
+        ("b1", 1, 3),
+        ("b3", 4, 8),
+        ("a2", 5, 6.5),
+        ("b2", 6, 6.5),
+    ]
+    assert [sub.content for sub in srt.parse(unmatched)] == [
+        "a1",
+        "b1",
+        "b3",
+        "a2",
+        "b2",
+    ]
+
+
+def test_mux_restores_timestamp_cache_size():
+    mux_main = runpy.run_path("srt_tools/srt-mux")["main"]
+    in_file = os.path.join(sample_dir, "ascii.srt")
+
+    old_argv = sys.argv
+    previous_cache_size = srt.set_timestamp_cache_size(7)
+    with temp_file("") as out_file:
+        sys.argv = ["srt-mux", "-i", in_file, "-i", in_file, "-o", out_file]
+        try:
+            mux_main()
+        finally:
+            sys.argv = old_argv
+            srt_tools.utils.close_opened_files()
+            cache_size = srt.set_timestamp_cache_size(previous_cache_size)
+
+    # Timestamps can only be cached with functools.lru_cache
+    assert cache_size == (7 if hasattr(functools, "lru_cache") else 0)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch(jobs):
+    out_dir = tempfile.mkdtemp()
+    in_file = os.path.join(sample_dir, "ascii.srt")
+    tool_args = ["fixed-timeshift", "--seconds", "5"]
+
+    with temp_file("not an srt file\n") as bad_file:
+        cmd = [sys.executable, "srt_tools/srt-batch", "-i", in_file, "-i", bad_file]
+        cmd += ["-d", out_dir, "--jobs", str(jobs)] + tool_args
+
+        try:
+            # One file failing shouldn't stop the others, but should be
+            # reported in the exit code
+            env = {"PYTHONPATH": ".", "SystemRoot": r"C:\Windows"}
+            assert subprocess.call(cmd, env=env) == 1
+            assert os.listdir(out_dir) == ["ascii.srt"]
+
+            with open(os.path.join(out_dir, "ascii.srt"), "rb") as out_f:
+                from_batch = out_f.read().decode("utf-8")
+            from_tool = run_srt_util(
+                [sys.executable, "srt_tools/srt-" + tool_args[0]]
+                + tool_args[1:]
+                + ["-i", in_file]
+            )
+            assert from_batch == from_tool
+        finally:
+            shutil.rmtree(out_dir)
+
+
+def test_batch_failure_keeps_existing_output():
+    in_dir = tempfile.mkdtemp()
+    good_file = os.path.join(in_dir, "good.srt")
+    shutil.copy(os.path.join(sample_dir, "ascii.srt"), good_file)
+    bad_file = os.path.join(in_dir, "bad.srt")
+    with open(bad_file, "w") as bad_f:
+        bad_f.write("not an srt file\n")
+
+    # Each output is written over its input
+    cmd = [sys.executable, "srt_tools/srt-batch", "-i", good_file, "-i", bad_file]
+    cmd += ["-t", "{dir}/{name}", "normalise"]
+
+    try:
+        env = {"PYTHONPATH": ".", "SystemRoot": r"C:\Windows"}
+        assert subprocess.call(cmd, env=env) == 1
+
+        # No temporary files are left behind, and the failed output didn't
+        # touch the input it would have replaced
+        assert sorted(os.listdir(in_dir)) == ["bad.srt", "good.srt"]
+        with open(bad_file) as bad_f:
+            assert bad_f.read() == "not an srt file\n"
+
+        with open(good_file, "rb") as good_f:
+            from_batch = good_f.read().decode("utf-8")
+        from_tool = run_srt_util(
+            [
+                sys.executable,
+                "srt_tools/srt-normalise",
+                "-i",
+                os.path.join(sample_dir, "ascii.srt"),
+            ]
+        )
+        assert from_batch == from_tool
+    finally:
+        shutil.rmtree(in_dir)
+
+
+def test_batch_tool_exiting_keeps_existing_output():
+    out_dir = tempfile.mkdtemp()
+    out_file = os.path.join(out_dir, "ascii.srt")
+    with open(out_file, "w") as out_f:
+        out_f.write("existing output\n")
+
+    # --help exits with 0, but writes no output
+    in_file = os.path.join(sample_dir, "ascii.srt")
+    cmd = [sys.executable, "srt_tools/srt-batch", "-i", in_file, "-d", out_dir]
+    cmd += ["normalise", "--help"]
+
+    try:
+        env = {"PYTHONPATH": ".", "SystemRoot": r"C:\Windows"}
+        with open(os.devnull, "w") as devnull:
+            assert subprocess.call(cmd, env=env, stdout=devnull) == 1
+
+        assert os.listdir(out_dir) == ["ascii.srt"]
+        with open(out_file) as out_f:
+            assert out_f.read() == "existing output\n"
+    finally:
+        shutil.rmtree(out_dir)
+
+
+@pytest.fixture(params=["numpy", "pure"])
+def time_map_backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(srt_tools.utils, "numpy", None)
+    return request.param
+
+
+def test_affine_time_map(time_map_backend):
+    times = array(srt.ARRAY_TYPECODE, [0, 1000, 2500, -400])
+    shifted = srt_tools.utils.affine_time_map(times, linear=-500)
+    assert shifted == array(srt.ARRAY_TYPECODE, [-500, 500, 2000, -900])
+    scaled = srt_tools.utils.affine_time_map(times, 1.5, 0.4)
+    assert scaled == array(srt.ARRAY_TYPECODE, [0, 1500, 3750, -600])
+
+
+def test_piecewise_affine_time_map(time_map_backend):
+    times = array(srt.ARRAY_TYPECODE, [-1000, 0, 500, 1000, 1500, 3000])
+    anchors = [(2000, 4000), (0, 0), (1000, 1000)]
+    mapped = srt_tools.utils.piecewise_affine_time_map(times, anchors)
+    assert mapped == array(srt.ARRAY_TYPECODE, [-1000, 0, 500, 1000, 2500, 7000])
+
+    two_anchors = srt_tools.utils.piecewise_affine_time_map(times, anchors[:2])
+    angular, linear = srt_tools.utils.calc_correction(0, 4000, 0, 2000)
+    assert two_anchors == srt_tools.utils.affine_time_map(times, angular, linear)
+
+
+def test_piecewise_affine_time_map_bad_anchors():
+    with pytest.raises(ValueError):
+        srt_tools.utils.piecewise_affine_time_map(array(srt.ARRAY_TYPECODE), [(0, 0)])
+    with pytest.raises(ValueError):
+        srt_tools.utils.piecewise_affine_time_map(
+            array(srt.ARRAY_TYPECODE), [(0, 0), (0, 1)]
+        )
@@ -1,18 +1,28 @@
 #!/usr/bin/env python
 
+from __future__ import division
+
 import argparse
+import bisect
 import codecs
+import io
 import srt
 import logging
 import sys
 import itertools
 import os
+from array import array
 
 try:
     from collections.abc import MutableSequence
 except ImportError:
     from collections import MutableSequence
 
+try:
+    import numpy
+except ImportError:  # numpy is optional, we have pure Python fallbacks
+    numpy = None
+
 PROG_NAME = os.path.basename(sys.argv[0]).replace("-", " ", 1)
 
 STDIN_BYTESTREAM = getattr(sys.stdin, "buffer", sys.stdin)
@@ -27,6 +37,14 @@ except NameError:
 
 log = logging.getLogger(__name__)
 
+PARSE_FAILED_MESSAGE = (
+    "Parsing failed, maybe you need to pass a different encoding with --encoding?"
+)
+
+# Files opened by set_basic_args, so that srt batch can close them as soon as
+# each tool finishes, rather than whenever they are garbage collected
+_opened_files = []
+
 
 def noop(stream):
     """
@@ -42,13 +60,10 @@ def dash_to_stream(arg, arg_type):
     return arg
 
 
-def basic_parser(
-    description=None,
-    multi_input=False,
-    no_output=False,
-    examples=None,
-    hide_no_strict=False,
-):
+def format_examples(examples):
+    """
+    Format a dict of example descriptions to commands for a parser epilog.
+    """
     example_lines = []
 
     if examples is not None:
@@ -58,10 +73,21 @@ def basic_parser(
             example_lines.append("  {}".format(desc))
             example_lines.append("    $ {}\n".format(code))
 
+    return "\n".join(example_lines)
+
+
+def basic_parser(
+    description=None,
+    multi_input=False,
+    no_output=False,
+    examples=None,
+    hide_no_strict=False,
+    sort_window=False,
+):
     parser = argparse.ArgumentParser(
         prog=PROG_NAME,
         description=description,
-        epilog="\n".join(example_lines),
+        epilog=format_examples(examples),
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
 
@@ -105,6 +131,17 @@ def basic_parser(
                 help="modify file in place",
             )
 
+    if sort_window:
+        parser.add_argument(
+            "--sort-window",
+            metavar="N",
+            type=int,
+            help="only sort N subtitles at a time, instead of reading all of "
+            "them first, so output starts straight away and memory use stays "
+            "bounded. The input must be in start time order, or at most N "
+            "subtitles out of it",
+        )
+
     shelp = "allow blank lines in output, your media player may explode"
     if hide_no_strict:
         shelp = argparse.SUPPRESS
@@ -132,7 +169,16 @@ def basic_parser(
     return parser
 
 
-def set_basic_args(args):
+def set_basic_args(args, as_table=False):
+    """
+    Open the input and output streams named in ``args``, replacing them with
+    parsed subtitles and writable streams respectively.
+
+    If ``as_table`` is True, inputs are parsed into a
+    :py:class:`srt.SubtitleTable` instead of a generator of subtitles, and
+    the output is left as a binary stream, for
+    :py:meth:`srt.SubtitleTable.compose_bytes`.
+    """
     # TODO: dedupe some of this
     if getattr(args, "inplace", None):
         if args.input == DASH_STREAM_MAP["input"]:
@@ -159,7 +205,6 @@ def set_basic_args(args):
         read_encoding = args.encoding or "utf-8-sig"
         write_encoding = args.encoding or "utf-8"
 
-        r_enc = codecs.getreader(read_encoding)
         w_enc = codecs.getwriter(write_encoding)
 
         log.debug("Got %r as stream", stream)
@@ -168,10 +213,8 @@ def set_basic_args(args):
         if stream in DASH_STREAM_MAP.values():
             log.debug("%s in DASH_STREAM_MAP", stream_name)
             if stream is args.input:
-                args.input = srt.parse(
-                    r_enc(args.input).read(), ignore_errors=args.ignore_parsing_errors
-                )
-            elif stream is args.output:
+                args.input = parse_input(args.input, read_encoding, args, as_table)
+            elif stream is args.output and not as_table:
                 # Since args.output is not in text mode (since we didn't
                 # earlier know the encoding), we have no universal newline
                 # support and need to do it ourselves
@@ -183,38 +226,244 @@ def set_basic_args(args):
                     for i, input_fn in enumerate(args.input):
                         if input_fn in DASH_STREAM_MAP.values():
                             if stream is args.input:
-                                args.input[i] = srt.parse(
-                                    r_enc(input_fn).read(),
-                                    ignore_errors=args.ignore_parsing_errors,
+                                args.input[i] = parse_input(
+                                    input_fn, read_encoding, args, as_table
                                 )
                         else:
-                            f = r_enc(open(input_fn, "rb"))
-                            with f:
-                                args.input[i] = srt.parse(
-                                    f.read(), ignore_errors=args.ignore_parsing_errors
-                                )
+                            args.input[i] = parse_input_file(
+                                input_fn, read_encoding, args, as_table
+                            )
                 else:
-                    f = r_enc(open(stream, "rb"))
-                    with f:
-                        args.input = srt.parse(
-                            f.read(), ignore_errors=args.ignore_parsing_errors
-                        )
+                    args.input = parse_input_file(stream, read_encoding, args, as_table)
+            elif as_table:
+                args.output = _open(args.output, "wb")
             else:
-                args.output = w_enc(open(args.output, "wb"))
+                args.output = w_enc(_open(args.output, "wb"))
+
+
+def _open(filename, mode):
+    stream = open(filename, mode)
+    _opened_files.append(stream)
+    return stream
+
+
+def close_opened_files():
+    """
+    Close every file which :py:func:`set_basic_args` has opened so far.
+    """
+    while _opened_files:
+        _opened_files.pop().close()
+
+
+class FallbackEncodingWriter(object):
+    """
+    Wraps a stream so that if it won't take unicode, we write it encoded.
+    """
+
+    def __init__(self, stream, encoding):
+        self.stream = stream
+        self.encoding = encoding
+
+    def write(self, data):
+        try:
+            self.stream.write(data)
+        except (UnicodeEncodeError, TypeError):  # Python 2 fallback
+            self.stream.write(data.encode(self.encoding))
+
+    def flush(self):
+        self.stream.flush()
 
 
-def compose_suggest_on_fail(subs, strict=True):
+def parse_input(stream, encoding, args, as_table=False):
+    """
+    Parse SRT data read from a binary input stream, as a generator of
+    subtitles, or as a :py:class:`srt.SubtitleTable` if ``as_table`` is True.
+
+    Subtitles are parsed as the generator is consumed, reading ``stream`` a
+    chunk at a time, so it must stay open until then.
+    """
+    if not as_table:
+        return srt.parse_stream(
+            codecs.getreader(encoding)(stream),
+            ignore_errors=args.ignore_parsing_errors,
+        )
+
+    # Tables can keep content encoded, so we don't decode it here at all
     try:
-        return srt.compose(subs, strict=strict, eol=os.linesep, in_place=True)
-    except srt.SRTParseError as thrown_exc:
-        # Since `subs` is actually a generator
-        log.critical(
-            "Parsing failed, maybe you need to pass a different encoding "
-            "with --encoding?"
+        return srt.SubtitleTable.from_bytes(
+            stream.read(), encoding, ignore_errors=args.ignore_parsing_errors
         )
+    except srt.SRTParseError:
+        log.critical(PARSE_FAILED_MESSAGE)
         raise
 
 
+def parse_input_file(filename, encoding, args, as_table=False):
+    """
+    Like :py:func:`parse_input`, but open ``filename`` to read from. When
+    parsing lazily, the file is closed once all of its subtitles have been
+    read, and with ``--inplace``, it is read in full first, since it's about
+    to be overwritten.
+    """
+    if as_table or getattr(args, "inplace", None):
+        with open(filename, "rb") as stream:
+            if as_table:
+                return parse_input(stream, encoding, args, as_table)
+            return parse_input(io.BytesIO(stream.read()), encoding, args)
+
+    stream = _open(filename, "rb")
+    return _close_when_done(parse_input(stream, encoding, args), stream)
+
+
+def _close_when_done(subs, stream):
+    try:
+        for sub in subs:
+            yield sub
+    finally:
+        stream.close()
+
+
+def compose_suggest_on_fail(
+    subs, output, strict=True, encoding=None, reindex=True, window=None
+):
+    """
+    Write ``subs`` to ``output``, logging a hint about the encoding if they
+    fail to parse.
+
+    Reindexing means sorting, which reads every subtitle before writing any,
+    unless ``window`` is given, in which case only that many are held back
+    (see :py:func:`srt.sort_and_reindex`).
+    """
+    if isinstance(subs, srt.SubtitleTable):
+        # set_basic_args leaves the output as a binary stream for tables
+        subs.compose_to(
+            output, strict=strict, eol=os.linesep, encoding=encoding or "utf-8"
+        )
+    else:
+        output = FallbackEncodingWriter(output, encoding)
+        if reindex and window is not None:
+            subs = srt.sort_and_reindex(subs, window=window, in_place=True)
+            reindex = False
+        try:
+            srt.compose_to(
+                subs,
+                output,
+                reindex=reindex,
+                strict=strict,
+                eol=os.linesep,
+                in_place=True,
+            )
+        except srt.SRTParseError as thrown_exc:
+            # Since `subs` is actually a generator
+            log.critical(PARSE_FAILED_MESSAGE)
+            raise
+
+    # Don't wait for exit to flush, since with srt batch we may not exit for a
+    # while
+    output.flush()
+
+
+def calc_correction(to_start, to_end, from_start, from_end):
+    """
+    Work out the linear map taking ``from_start`` to ``to_start`` and
+    ``from_end`` to ``to_end``.
+
+    :returns: The angular and linear coefficients
+    :rtype: (float, float)
+    """
+    angular = (to_end - to_start) / (from_end - from_start)
+    linear = to_end - angular * from_end
+    return angular, linear
+
+
+def affine_time_map(times, angular=1, linear=0):
+    """
+    Map every time in ``times`` to ``round(time * angular + linear)`` in one
+    go, using numpy if it's available.
+
+    :param times: Times in milliseconds
+    :type times: array.array of type ``srt.ARRAY_TYPECODE``
+    :returns: The mapped times
+    :rtype: array.array of type ``srt.ARRAY_TYPECODE``
+    """
+    if angular == 1 and linear == int(linear):
+        # Just a shift, so we can stay in integers the whole way
+        linear = int(linear)
+        if numpy is not None:
+            return _from_numpy(_to_numpy(times) + linear)
+        return array(srt.ARRAY_TYPECODE, [time + linear for time in times])
+
+    if numpy is not None:
+        return _from_numpy(numpy.rint(_to_numpy(times) * angular + linear))
+    return array(
+        srt.ARRAY_TYPECODE, [int(round(time * angular + linear)) for time in times]
+    )
+
+
+def piecewise_affine_time_map(times, anchors):
+    """
+    Map every time in ``times`` through the piecewise linear function which
+    passes through each anchor, using numpy if it's available. Times before
+    the first anchor or after the last are extrapolated from the first or
+    last piece respectively. With two anchors, this is the same as
+    :py:func:`affine_time_map` with the coefficients from
+    :py:func:`calc_correction`.
+
+    Each time is placed into its piece by binary search, so this costs
+    O(log k) per time for k anchors.
+
+    :param times: Times in milliseconds
+    :type times: array.array of type ``srt.ARRAY_TYPECODE``
+    :param anchors: At least two (from, to) pairs of times in milliseconds,
+                    in any order, with no two having the same from time
+    :returns: The mapped times
+    :rtype: array.array of type ``srt.ARRAY_TYPECODE``
+    :raises ValueError: If there are fewer than two anchors, or the from
+                        times are not unique
+    """
+    anchors = sorted(anchors)
+
+    if len(anchors) < 2:
+        raise ValueError("Need at least two anchors, got %d" % len(anchors))
+
+    froms = [from_time for from_time, _ in anchors]
+    segments = []
+    for (from_start, to_start), (from_end, to_end) in zip(anchors, anchors[1:]):
+        if from_start == from_end:
+            raise ValueError("Multiple anchors from time %d" % from_start)
+        segments.append(calc_correction(to_start, to_end, from_start, from_end))
+
+    last_segment = len(segments) - 1
+
+    if numpy is not None:
+        np_times = _to_numpy(times)
+        np_segments = numpy.searchsorted(froms, np_times, side="right") - 1
+        np_segments = numpy.clip(np_segments, 0, last_segment)
+        angulars, linears = (numpy.array(coeffs) for coeffs in zip(*segments))
+        return _from_numpy(
+            numpy.rint(np_times * angulars[np_segments] + linears[np_segments])
+        )
+
+    bisect_right = bisect.bisect_right
+    mapped = array(srt.ARRAY_TYPECODE)
+    for time in times:
+        segment = min(max(bisect_right(froms, time) - 1, 0), last_segment)
+        angular, linear = segments[segment]
+        mapped.append(int(round(time * angular + linear)))
+    return mapped
+
+
+def _to_numpy(times):
+    # srt.ARRAY_TYPECODE isn't always 64 bits on Python 2, so use its size
+    return numpy.frombuffer(times, dtype="=i{}".format(times.itemsize))
+
+
+def _from_numpy(np_times):
+    itemsize = array(srt.ARRAY_TYPECODE).itemsize
+    np_times = np_times.astype("=i{}".format(itemsize))
+    return array(srt.ARRAY_TYPECODE, np_times.tobytes())
+
+
 def sliding_window(seq, width=2, inclusive=True):
     """
     If inclusive is True, we also include final elements where len(sliced) <
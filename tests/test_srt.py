@@ -3,12 +3,21 @@
 
 from __future__ import unicode_literals
 from datetime import timedelta
+import codecs
 import collections
 import functools
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.dummy
 import os
+import pickle
 import re
 import string
-from io import StringIO
+import struct
+import tempfile
+import timeit
+from io import BytesIO, StringIO
 
 import pytest
 from hypothesis import given, settings, HealthCheck, assume, example
@@ -199,6 +208,19 @@ def test_can_compose_without_eol_at_all(input_subs):
     subs_eq(reparsed_subs, input_subs)
 
 
+@pytest.mark.parametrize("eol", ["\r", "%", "%s"])
+def test_compose_with_unusual_eol(eol):
+    sub = srt.Subtitle(
+        index=1,
+        start=timedelta(seconds=1),
+        end=timedelta(seconds=2),
+        content="a\nb",
+        proprietary="x",
+    )
+    expected = "1{0}00:00:01,000 --> 00:00:02,000 x{0}a{0}b{0}{0}".format(eol)
+    assert srt.compose([sub], eol=eol) == expected
+
+
 @given(st.text().filter(is_strictly_legal_content))
 def test_compose_and_parse_strict_mode(content):
     # sub.content should not have OS-specific line separators, only \n
@@ -382,6 +404,39 @@ def test_sort_and_reindex(input_subs, start_index):
     assert reindexed_subs == expected_sorting
 
 
+@pytest.mark.parametrize(
+    "sub,skip_reason",
+    [
+        (CONTENTLESS_SUB(content=" \n"), "No content"),
+        (
+            CONTENTLESS_SUB(start=timedelta(seconds=-1), content="x"),
+            "Start time < 0 seconds",
+        ),
+        (
+            CONTENTLESS_SUB(start=timedelta(seconds=2), content="x"),
+            "Subtitle start time >= end time",
+        ),
+        (CONTENTLESS_SUB(content="x"), None),
+    ],
+)
+def test_skip_conditions(sub, skip_reason, caplog):
+    skip_reasons = [
+        info_msg
+        for info_msg, sub_skipper in srt.SUBTITLE_SKIP_CONDITIONS
+        if sub_skipper(sub)
+    ]
+    assert skip_reasons == ([skip_reason] if skip_reason else [])
+
+    # Subtitles and tables are skipped by the same rules, for the same reasons
+    with caplog.at_level(logging.INFO, logger="srt"):
+        composed = srt.compose([sub])
+        table_composed = srt.SubtitleTable.from_subtitles([sub]).compose()
+    assert table_composed == composed
+    assert [record.getMessage() for record in caplog.records] == (
+        ["Skipped subtitle at index 1: " + skip_reason] * 2 if skip_reason else []
+    )
+
+
 @given(st.lists(subtitles()))
 def test_sort_and_reindex_no_skip(input_subs):
     # end time > start time should not trigger a skip if skip=False
@@ -469,6 +524,205 @@ def test_sort_and_reindex_not_in_place_matches(input_subs, start_index):
     assert all(id(sub) in ip_ids for sub in in_place_output)
 
 
+@given(st.lists(subtitles()), st.integers(min_value=0), st.booleans())
+def test_sort_and_reindex_matches_sorted(input_subs, start_index, integer_ms):
+    if integer_ms:
+        input_subs = [to_millisecond_subtitle(sub) for sub in input_subs]
+    input_copies = [sub.copy() for sub in input_subs]
+
+    expected = [sub.copy() for sub in sorted(input_subs)]
+    for index, sub in enumerate(expected, start=start_index):
+        sub.index = index
+
+    reindexed_subs = list(
+        srt.sort_and_reindex(input_subs, start_index=start_index, skip=False)
+    )
+    assert reindexed_subs == expected
+    assert input_subs == input_copies
+
+
+@given(
+    st.lists(subtitles()),
+    st.integers(min_value=1, max_value=5),
+    st.randoms(),
+    st.booleans(),
+)
+def test_sort_and_reindex_window_matches_full_sort(input_subs, block_size, rand, skip):
+    # Shuffle within blocks, so no subtitle is more than block_size out of
+    # order
+    input_subs = sorted(input_subs)
+    for block_start in range(0, len(input_subs), block_size):
+        block = input_subs[block_start : block_start + block_size]
+        rand.shuffle(block)
+        input_subs[block_start : block_start + block_size] = block
+
+    assert list(srt.sort_and_reindex(input_subs, skip=skip, window=block_size)) == list(
+        srt.sort_and_reindex(input_subs, skip=skip)
+    )
+
+
+def test_sort_and_reindex_window_streams():
+    def forever():
+        for secs in itertools.count():
+            yield srt.Subtitle(0, timedelta(seconds=secs), timedelta(days=1), "x")
+
+    reindexed_subs = srt.sort_and_reindex(forever(), window=2)
+    first_subs = list(itertools.islice(reindexed_subs, 3))
+    assert [sub.index for sub in first_subs] == [1, 2, 3]
+
+
+def test_sort_and_reindex_window_out_of_order_raises():
+    subs = [
+        srt.Subtitle(1, timedelta(seconds=secs), timedelta(seconds=9), "x")
+        for secs in (2, 3, 1)
+    ]
+    assert len(list(srt.sort_and_reindex(subs, window=2))) == 3
+
+    with pytest.raises(srt.SubtitleOrderError) as exc_info:
+        list(srt.sort_and_reindex(subs, window=1))
+    assert exc_info.value.subtitle is subs[2]
+    assert exc_info.value.window == 1
+
+    with pytest.raises(ValueError):
+        list(srt.sort_and_reindex(subs, window=-1))
+
+
+@given(
+    st.lists(subtitles()),
+    st.integers(min_value=1, max_value=5),
+    st.booleans(),
+    st.booleans(),
+)
+def test_sort_and_reindex_run_size_matches_full_sort(
+    input_subs, run_size, integer_ms, skip
+):
+    if integer_ms:
+        input_subs = [to_millisecond_subtitle(sub) for sub in input_subs]
+
+    assert list(
+        srt.sort_and_reindex(iter(input_subs), skip=skip, run_size=run_size)
+    ) == list(srt.sort_and_reindex(input_subs, skip=skip))
+
+
+def test_sort_and_reindex_run_size_batches(monkeypatch):
+    monkeypatch.setattr(srt, "EXTERNAL_SORT_BATCH_SIZE", 2)
+    subs = [
+        srt.Subtitle(0, timedelta(seconds=secs), timedelta(days=1), str(secs))
+        for secs in (5, 1, 4, 2, 8, 3, 7, 6, 0)
+    ]
+    reindexed_subs = list(srt.sort_and_reindex(subs, start_index=0, run_size=3))
+    assert [sub.content for sub in reindexed_subs] == [str(i) for i in range(9)]
+    assert [sub.index for sub in reindexed_subs] == list(range(9))
+
+
+def test_sort_and_reindex_run_size_keeps_subclasses():
+    class LocalSubtitle(srt.Subtitle):
+        __slots__ = ()
+
+    subs = [
+        LocalSubtitle(None, timedelta(days=-1, microseconds=1), timedelta(0), "\ud800"),
+        srt.MillisecondSubtitle(10**20, 1, 2, "x", "y"),
+        srt.Subtitle(-1, timedelta(seconds=3), timedelta(days=2), ""),
+    ]
+    expected_subs = list(srt.sort_and_reindex(subs, skip=False))
+    reindexed_subs = list(srt.sort_and_reindex(iter(subs), run_size=1, skip=False))
+    assert reindexed_subs == expected_subs
+    assert list(map(type, reindexed_subs)) == list(map(type, expected_subs))
+
+
+def test_sort_and_reindex_run_size_bad_arguments_raise():
+    subs = [srt.Subtitle(1, 0.5, 1.5, "x")] * 2
+
+    with pytest.raises(struct.error):
+        list(srt.sort_and_reindex(subs, run_size=1))
+    with pytest.raises(ValueError):
+        list(srt.sort_and_reindex(subs, run_size=0))
+    with pytest.raises(ValueError):
+        list(srt.sort_and_reindex(subs, window=1, run_size=1))
+
+
+class LatestFirstSubtitle(srt.Subtitle):
+    __slots__ = ()
+
+    def __lt__(self, other):
+        return self.start > other.start
+
+
+class ShoutingSubtitle(srt.Subtitle):
+    __slots__ = ()
+
+    def to_srt(self, strict=True, eol="\n"):
+        return super(ShoutingSubtitle, self).to_srt(strict, eol).upper()
+
+
+def test_sort_and_reindex_uses_subclass_ordering():
+    subs = [
+        LatestFirstSubtitle(0, timedelta(seconds=secs), timedelta(seconds=9), "x")
+        for secs in (1, 3, 2)
+    ]
+    reindexed_subs = list(srt.sort_and_reindex(subs))
+    assert [sub.start.seconds for sub in reindexed_subs] == [3, 2, 1]
+    assert [sub.index for sub in reindexed_subs] == [1, 2, 3]
+
+
+def test_compose_uses_subclass_to_srt():
+    sub = ShoutingSubtitle(5, timedelta(seconds=1), timedelta(seconds=2), "x")
+    assert srt.compose([sub]) == "1\n00:00:01,000 --> 00:00:02,000\nX\n\n"
+    assert sub.index == 5
+
+
+def assert_index_matches_linear_scan(times, query_start, query_end):
+    subs = [
+        srt.Subtitle(
+            pos, timedelta(milliseconds=start), timedelta(milliseconds=end), ""
+        )
+        for pos, (start, end) in enumerate(times)
+    ]
+    query_start = timedelta(milliseconds=query_start)
+    query_end = timedelta(milliseconds=query_end)
+    index = srt.SubtitleIndex(subs)
+
+    on_screen = sorted(
+        (sub for sub in subs if sub.start < sub.end), key=lambda sub: sub.start
+    )
+    assert list(index) == on_screen
+    assert len(index) == len(on_screen)
+
+    assert index.overlapping(query_start, query_end) == [
+        sub
+        for sub in on_screen
+        if query_start < query_end and sub.start < query_end and query_start < sub.end
+    ]
+    assert index.at(query_start) == [
+        sub for sub in on_screen if sub.start <= query_start < sub.end
+    ]
+    assert list(index.overlaps()) == [
+        (sub, other_sub)
+        for sub, other_sub in itertools.combinations(on_screen, 2)
+        if other_sub.start < sub.end and sub.start < other_sub.end
+    ]
+
+
+@given(
+    st.lists(st.tuples(st.integers(0, 1000), st.integers(0, 1000))),
+    st.integers(0, 1000),
+    st.integers(0, 1000),
+)
+def test_subtitle_index_matches_linear_scan(times, query_start, query_end):
+    assert_index_matches_linear_scan(times, query_start, query_end)
+
+
+@pytest.mark.parametrize("count", [0, 1, 15, 16, 17, 100, 300])
+def test_subtitle_index_matches_linear_scan_when_deep(count):
+    # Deep enough that queries have to descend the tree, rather than only
+    # scanning it
+    times = [
+        (pos * 37 % 1000, pos * 37 % 1000 + pos * 53 % 120 - 10) for pos in range(count)
+    ]
+    for query_start, query_end in [(0, 1000), (500, 510), (990, 2000), (300, 200)]:
+        assert_index_matches_linear_scan(times, query_start, query_end)
+
+
 @given(
     st.lists(subtitles(), min_size=1),
     st.integers(min_value=0),
@@ -771,3 +1025,880 @@ def test_parse_file_with_missing_index(input_subs):  # cf. issue #51
 
     # ...and sort the same.
     assert srt.compose(subs_no_index) == srt.compose(subs_zero_index)
+
+
+@given(st.lists(subtitles()), st.integers(min_value=1, max_value=64))
+def test_parse_stream_matches_parse(input_subs, chunk_size):
+    composed = srt.compose(input_subs, reindex=False)
+    streamed_subs = srt.parse_stream(StringIO(composed), chunk_size=chunk_size)
+    subs_eq(streamed_subs, input_subs)
+
+
+@given(
+    st.lists(subtitles()),
+    st.integers(min_value=1, max_value=64),
+    st.sampled_from(["\n", "\n\n", "\r\n", "\r\n\r\n\r\n"]),
+)
+def test_parse_stream_content_with_blank_lines(input_subs, chunk_size, separator):
+    for subtitle in input_subs:
+        subtitle.content = subtitle.content + "\n\n" + subtitle.content
+
+    composed = "".join(
+        sub.to_srt(strict=False).rstrip("\n") + separator for sub in input_subs
+    )
+    streamed_subs = srt.parse_stream(StringIO(composed), chunk_size=chunk_size)
+    subs_eq(streamed_subs, srt.parse(composed))
+
+
+@given(
+    st.lists(subtitles(), min_size=1),
+    st.integers(min_value=0),
+    st.text(min_size=1),
+    timedeltas(),
+    st.integers(min_value=1, max_value=64),
+)
+def test_parse_stream_noncontiguous_same_error(
+    subs, fake_idx, garbage, fake_timedelta, chunk_size
+):
+    composed = srt.compose(subs)
+    srt_timestamp = srt.timedelta_to_srt_timestamp(fake_timedelta)
+    composed = composed.replace(
+        "\n\n", "\n\n%d\n%s %s" % (fake_idx, srt_timestamp, garbage)
+    )
+
+    with pytest.raises(srt.SRTParseError) as expected_exc:
+        list(srt.parse(composed))
+
+    with pytest.raises(srt.SRTParseError) as thrown_exc:
+        list(srt.parse_stream(StringIO(composed), chunk_size=chunk_size))
+
+    assert thrown_exc.value.expected_start == expected_exc.value.expected_start
+    assert thrown_exc.value.actual_start == expected_exc.value.actual_start
+    assert thrown_exc.value.unmatched_content == expected_exc.value.unmatched_content
+
+    # Should not raise, we have ignore_errors
+    subs_eq(
+        srt.parse_stream(StringIO(composed), ignore_errors=True, chunk_size=chunk_size),
+        srt.parse(composed, ignore_errors=True),
+    )
+
+
+def test_parse_stream_splits_without_blank_lines():
+    subs = [
+        srt.Subtitle(index, timedelta(seconds=index), timedelta(seconds=index + 1), "x")
+        for index in range(1, 1001)
+    ]
+    composed = srt.compose(subs).replace("\n\n", "\n")
+    stream = StringIO(composed)
+
+    # The first block should come out long before the whole input is read
+    streamed_subs = srt.parse_stream(stream, chunk_size=64)
+    first_sub = next(streamed_subs)
+    assert stream.tell() <= 128
+
+    subs_eq(itertools.chain([first_sub], streamed_subs), subs)
+
+
+EMPTY_CONTENT_WITHOUT_BLANK_LINE = (
+    "1\n00:00:01,000 --> 00:00:02,000\n2\n00:00:03,000 --> 00:00:04,000\nfoo\n"
+)
+
+
+@pytest.mark.parametrize("engine", ["fast", "regex"])
+@pytest.mark.parametrize("chunk_size", [1, 8, 32, 64])
+def test_parse_stream_empty_content_without_blank_line(engine, chunk_size):
+    # SRT_REGEX takes the second block as the first's content here, since a
+    # block with no content only ends at a blank line
+    composed = EMPTY_CONTENT_WITHOUT_BLANK_LINE
+    streamed_subs = list(
+        srt.parse_stream(StringIO(composed), chunk_size=chunk_size, engine=engine)
+    )
+    assert len(streamed_subs) == 1
+    subs_eq(streamed_subs, srt.parse(composed, engine=engine))
+
+
+@given(
+    st.lists(st.tuples(subtitles(), st.booleans())),
+    st.integers(min_value=1, max_value=64),
+    st.sampled_from(["\n", "\n\n", "\r\n"]),
+)
+@example(
+    [
+        (CONTENTLESS_SUB(content="x"), True),
+        (
+            srt.Subtitle(2, timedelta(seconds=3), timedelta(seconds=4), "foo"),
+            False,
+        ),
+    ],
+    64,
+    "\n",
+)
+def test_parse_stream_empty_content_matches_parse(subs, chunk_size, separator):
+    composed = ""
+    for sub, empty in subs:
+        if empty:
+            sub.content = ""
+        composed += sub.to_srt(strict=False).rstrip("\n") + separator
+
+    streamed_subs = srt.parse_stream(StringIO(composed), chunk_size=chunk_size)
+    subs_eq(streamed_subs, srt.parse(composed))
+
+
+@given(st.text(string.whitespace), st.lists(subtitles()))
+def test_parse_stream_leading_whitespace(ws, subs):
+    prews_block = ws + srt.compose(subs, reindex=False, strict=False)
+    streamed_subs = srt.parse_stream(StringIO(prews_block), chunk_size=1)
+    subs_eq(streamed_subs, subs)
+
+
+@given(
+    st.lists(subtitles()),
+    st.integers(min_value=1, max_value=256),
+    st.one_of(st.just("\n"), st.just("\r\n")),
+)
+def test_compose_to_matches_compose(input_subs, buffer_size, eol):
+    out = StringIO()
+    srt.compose_to(input_subs, out, eol=eol, buffer_size=buffer_size)
+    assert out.getvalue() == srt.compose(input_subs, eol=eol)
+
+
+@given(
+    st.lists(subtitles(strict=False)),
+    st.sampled_from(["\n", "\r\n"]),
+    st.sampled_from(["", "\n", "\n\n"]),
+    st.booleans(),
+)
+def test_parse_engines_match(input_subs, eol, separator, strict):
+    composed = "".join(
+        sub.to_srt(strict=strict, eol=eol).rstrip("\r\n") + eol + separator
+        for sub in input_subs
+    )
+    fast_subs = srt.parse(composed, ignore_errors=True, engine="fast")
+    regex_subs = srt.parse(composed, ignore_errors=True, engine="regex")
+    subs_eq(fast_subs, regex_subs)
+
+
+@given(
+    st.lists(subtitles(), min_size=1),
+    st.integers(min_value=0),
+    st.text(min_size=1),
+    timedeltas(),
+)
+def test_parse_engines_noncontiguous_same_error(
+    subs, fake_idx, garbage, fake_timedelta
+):
+    composed = srt.compose(subs)
+    srt_timestamp = srt.timedelta_to_srt_timestamp(fake_timedelta)
+    composed = composed.replace(
+        "\n\n", "\n\n%d\n%s %s" % (fake_idx, srt_timestamp, garbage)
+    )
+
+    with pytest.raises(srt.SRTParseError) as expected_exc:
+        list(srt.parse(composed, engine="regex"))
+
+    with pytest.raises(srt.SRTParseError) as thrown_exc:
+        list(srt.parse(composed, engine="fast"))
+
+    assert thrown_exc.value.expected_start == expected_exc.value.expected_start
+    assert thrown_exc.value.actual_start == expected_exc.value.actual_start
+
+
+def test_parse_engines_match_blank_line_after_header():
+    composed = (
+        "1\n00:00:01,000 --> 00:00:02,000\n\nfoo\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\nbar\n"
+    )
+    subs_eq(srt.parse(composed, engine="fast"), srt.parse(composed, engine="regex"))
+    subs_eq(srt.parse_bytes(composed.encode("ascii")), srt.parse(composed))
+
+
+def without_blank_lines(num_subs):
+    composed = srt.compose(
+        srt.Subtitle(index, timedelta(seconds=index), timedelta(seconds=index + 1), "x")
+        for index in range(1, num_subs + 1)
+    )
+    return composed.replace("\n\n", "\n")
+
+
+def assert_linear_time(parse_func, small, large):
+    """
+    Check that parsing ``large`` doesn't take much more than proportionally
+    longer than parsing ``small``, taking the best of a few runs of each.
+    """
+    small_secs, large_secs = (
+        min(timeit.repeat(lambda: list(parse_func(data)), number=1, repeat=3))
+        for data in (small, large)
+    )
+    # 8 times the data, so quadratic time would be 64 times slower
+    assert large_secs / small_secs < 24, (small_secs, large_secs)
+
+
+def test_parse_without_blank_lines_is_linear():
+    assert_linear_time(srt.parse, without_blank_lines(1000), without_blank_lines(8000))
+
+
+@pytest.mark.parametrize("parse_func", [srt.parse_bytes, srt.SubtitleTable.from_bytes])
+def test_parse_bytes_without_blank_lines_is_linear(parse_func):
+    small, large = (
+        without_blank_lines(num_subs).encode("ascii") for num_subs in (1000, 8000)
+    )
+    assert_linear_time(parse_func, small, large)
+
+
+def test_parse_unknown_engine_raises():
+    with pytest.raises(ValueError):
+        list(srt.parse("", engine="nonexistent"))
+
+
+def parse_parallel(srt_data, **kwargs):
+    # Split even tiny inputs between workers, so that we actually test
+    # splitting and stitching the results back together
+    old_min_chunk_size = srt.PARALLEL_MIN_CHUNK_SIZE
+    srt.PARALLEL_MIN_CHUNK_SIZE = 1
+    try:
+        return list(srt.parse(srt_data, **kwargs))
+    finally:
+        srt.PARALLEL_MIN_CHUNK_SIZE = old_min_chunk_size
+
+
+# Every example starts a process pool, so keep the number of examples down
+@settings(max_examples=25)
+@given(
+    st.lists(subtitles(strict=False)),
+    st.integers(min_value=2, max_value=4),
+    st.sampled_from(["\n", "\r\n\r\n\r\n", " \n\t\n"]),
+    st.booleans(),
+)
+def test_parse_parallel_matches_parse(input_subs, jobs, separator, integer_ms):
+    composed = "".join(
+        "\n" + sub.to_srt(strict=False).rstrip("\n") + separator for sub in input_subs
+    )
+    parallel_subs = parse_parallel(composed, jobs=jobs, integer_ms=integer_ms)
+    subs_eq(parallel_subs, srt.parse(composed, integer_ms=integer_ms))
+
+
+@settings(max_examples=25)
+@given(
+    st.lists(subtitles(), min_size=1),
+    st.integers(min_value=0),
+    st.text(min_size=1),
+    timedeltas(),
+)
+def test_parse_parallel_noncontiguous_same_error(
+    subs, fake_idx, garbage, fake_timedelta
+):
+    composed = srt.compose(subs)
+    srt_timestamp = srt.timedelta_to_srt_timestamp(fake_timedelta)
+    composed = composed.replace(
+        "\n\n", "\n\n%d\n%s %s" % (fake_idx, srt_timestamp, garbage)
+    )
+
+    with pytest.raises(srt.SRTParseError) as expected_exc:
+        list(srt.parse(composed))
+
+    with pytest.raises(srt.SRTParseError) as thrown_exc:
+        parse_parallel(composed, jobs=2)
+
+    assert thrown_exc.value.expected_start == expected_exc.value.expected_start
+    assert thrown_exc.value.actual_start == expected_exc.value.actual_start
+    assert thrown_exc.value.unmatched_content == expected_exc.value.unmatched_content
+
+    # Should not raise, we have ignore_errors
+    subs_eq(
+        parse_parallel(composed, ignore_errors=True, jobs=2),
+        srt.parse(composed, ignore_errors=True),
+    )
+
+
+@given(st.lists(subtitles()), st.booleans())
+def test_parse_parallel_small_input(input_subs, integer_ms):
+    # Too small to be worth splitting, so this shouldn't even start a pool
+    composed = srt.compose(input_subs, reindex=False)
+    parallel_subs = srt.parse(StringIO(composed), jobs=None, integer_ms=integer_ms)
+    subs_eq(parallel_subs, srt.parse(composed, integer_ms=integer_ms))
+
+
+def test_parse_parallel_whitespace_before_split(monkeypatch):
+    # Use threads instead of processes, so that coverage can see the workers
+    monkeypatch.setattr(multiprocessing, "Pool", multiprocessing.dummy.Pool)
+
+    # On the whole input, the match after the garbage starts at the whitespace
+    # before the split, so that whitespace isn't part of the unmatched content
+    composed = "garbage\n \t\n\n1\n00:00:01,000 --> 00:00:02,000\na\n"
+
+    with pytest.raises(srt.SRTParseError) as expected_exc:
+        list(srt.parse(composed))
+
+    with pytest.raises(srt.SRTParseError) as thrown_exc:
+        parse_parallel(composed, jobs=2)
+
+    assert thrown_exc.value.actual_start == expected_exc.value.actual_start
+    assert thrown_exc.value.unmatched_content == "garbage"
+
+
+def test_parse_parallel_many_blocks(monkeypatch):
+    monkeypatch.setattr(multiprocessing, "Pool", multiprocessing.dummy.Pool)
+    subs = [CONTENTLESS_SUB(content="sub %d" % i) for i in range(100)]
+    composed = srt.compose(subs)
+    subs_eq(parse_parallel(composed, jobs=3), srt.parse(composed))
+
+
+@pytest.mark.parametrize("jobs", [2, 3, 4])
+def test_parse_parallel_empty_content_without_blank_line(monkeypatch, jobs):
+    # See test_parse_stream_empty_content_without_blank_line
+    monkeypatch.setattr(multiprocessing, "Pool", multiprocessing.dummy.Pool)
+    composed = EMPTY_CONTENT_WITHOUT_BLANK_LINE * 20
+    subs_eq(parse_parallel(composed, jobs=jobs), srt.parse(composed))
+
+
+def test_parse_parallel_bad_jobs_raises():
+    with pytest.raises(ValueError):
+        list(srt.parse("", jobs=0))
+
+
+def parse_file_data(data, **kwargs):
+    fd, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, "wb") as srt_f:
+            srt_f.write(data)
+        return list(srt.parse_file(path, **kwargs))
+    finally:
+        os.remove(path)
+
+
+@given(
+    st.lists(subtitles(strict=False)),
+    st.sampled_from(["\n", "\r\n"]),
+    st.sampled_from(["", "\n", "\n\n"]),
+    st.sampled_from(["utf-8", "utf-8-sig", "utf-16"]),
+    st.booleans(),
+)
+def test_parse_file_matches_parse(input_subs, eol, separator, encoding, integer_ms):
+    composed = "".join(
+        sub.to_srt(strict=False, eol=eol).rstrip("\r\n") + eol + separator
+        for sub in input_subs
+    )
+    data = composed.encode(encoding)
+    file_subs = parse_file_data(data, encoding=encoding, integer_ms=integer_ms)
+    subs_eq(file_subs, srt.parse(composed, integer_ms=integer_ms))
+
+
+@given(st.lists(subtitles()), st.sampled_from(["fast", "regex"]))
+def test_parse_file_ascii(input_subs, engine):
+    for subtitle in input_subs:
+        subtitle.content = subtitle.content.encode("ascii", "replace").decode("ascii")
+        subtitle.proprietary = ""
+
+    composed = srt.compose(input_subs, reindex=False)
+    file_subs = parse_file_data(
+        composed.encode("ascii"), encoding="ascii", engine=engine
+    )
+    subs_eq(file_subs, input_subs)
+
+
+@given(
+    st.lists(subtitles(), min_size=1),
+    st.integers(min_value=0),
+    st.text(min_size=1),
+    timedeltas(),
+)
+def test_parse_file_noncontiguous_same_error(subs, fake_idx, garbage, fake_timedelta):
+    composed = srt.compose(subs)
+    srt_timestamp = srt.timedelta_to_srt_timestamp(fake_timedelta)
+    composed = composed.replace(
+        "\n\n", "\n\n%d\n%s %s" % (fake_idx, srt_timestamp, garbage)
+    )
+    data = composed.encode("utf-8")
+
+    with pytest.raises(srt.SRTParseError) as expected_exc:
+        list(srt.parse(composed))
+
+    with pytest.raises(srt.SRTParseError) as thrown_exc:
+        parse_file_data(data)
+
+    assert thrown_exc.value.expected_start == expected_exc.value.expected_start
+    assert thrown_exc.value.actual_start == expected_exc.value.actual_start
+    assert thrown_exc.value.unmatched_content == expected_exc.value.unmatched_content
+
+    # Should not raise, we have ignore_errors
+    subs_eq(
+        parse_file_data(data, ignore_errors=True),
+        srt.parse(composed, ignore_errors=True),
+    )
+
+
+def test_parse_file_mixed_blocks(monkeypatch):
+    # Make sure that we switch between the bytes engine and decoded windows
+    # a few times, with some unmatched data carried over between windows
+    monkeypatch.setattr(srt, "DEFAULT_CHUNK_SIZE", 1)
+    composed = (
+        "1\r\n00:00:01,000 --> 00:00:02,000\r\nCRLF\r\n\r\n"
+        "2\n00:00:03,000 --> 00:00:04,000\nLF, caf\u00e9\n\n"
+        "3\n00:00:05,000 --> 00:00:06,000\nblank\n\nline\n\n"
+        "garbage\n\n"
+        "4\n00:00:07,000 --> 00:00:08,000 X:1\nno newline at the end"
+    )
+    data = composed.encode("utf-8")
+    subs_eq(
+        parse_file_data(data, ignore_errors=True),
+        srt.parse(composed, ignore_errors=True),
+    )
+
+
+@pytest.mark.parametrize("engine", ["fast", "regex"])
+@pytest.mark.parametrize("chunk_size", [1, 8, 32, 64])
+def test_parse_bytes_empty_content_without_blank_line(monkeypatch, engine, chunk_size):
+    # Small windows make the decoded fallback split the data, see
+    # test_parse_stream_empty_content_without_blank_line
+    monkeypatch.setattr(srt, "DEFAULT_CHUNK_SIZE", chunk_size)
+    composed = EMPTY_CONTENT_WITHOUT_BLANK_LINE
+    expected_subs = list(srt.parse(composed, engine=engine))
+    assert len(expected_subs) == 1
+
+    data = composed.encode("utf-8")
+    subs_eq(srt.parse_bytes(data, engine=engine), expected_subs)
+    subs_eq(parse_file_data(data, engine=engine), expected_subs)
+
+
+@given(
+    st.lists(st.tuples(subtitles(), st.booleans())),
+    st.integers(min_value=1, max_value=64),
+    st.sampled_from(["\n", "\n\n", "\r\n"]),
+    st.sampled_from(["fast", "regex"]),
+)
+def test_parse_bytes_empty_content_matches_parse(subs, chunk_size, separator, engine):
+    composed = ""
+    for sub, empty in subs:
+        if empty:
+            sub.content = ""
+        composed += sub.to_srt(strict=False).rstrip("\n") + separator
+    data = composed.encode("utf-8")
+    expected_subs = list(srt.parse(composed, engine=engine))
+
+    old_chunk_size = srt.DEFAULT_CHUNK_SIZE
+    srt.DEFAULT_CHUNK_SIZE = chunk_size
+    try:
+        subs_eq(srt.parse_bytes(data, engine=engine), expected_subs)
+        subs_eq(parse_file_data(data, engine=engine), expected_subs)
+    finally:
+        srt.DEFAULT_CHUNK_SIZE = old_chunk_size
+
+
+def test_parse_file_bom():
+    composed = srt.compose([CONTENTLESS_SUB(content="bom")])
+    data = codecs.BOM_UTF8 + composed.encode("utf-8")
+    subs_eq(parse_file_data(data, encoding="utf-8-sig"), srt.parse(composed))
+    subs_eq(parse_file_data(data), srt.parse(composed))
+
+
+def test_parse_file_empty():
+    assert parse_file_data(b"") == []
+
+
+def test_parse_file_unknown_engine_raises():
+    with pytest.raises(ValueError):
+        parse_file_data(b"", engine="nonexistent")
+
+
+@given(
+    st.lists(subtitles(strict=False)),
+    st.sampled_from(["\n", "\r\n"]),
+    st.sampled_from(["utf-8", "utf-8-sig", "utf-16"]),
+    st.booleans(),
+)
+def test_parse_bytes_matches_parse(input_subs, eol, encoding, integer_ms):
+    composed = srt.compose(input_subs, reindex=False, strict=False, eol=eol)
+    data = composed.encode(encoding)
+    subs_eq(
+        srt.parse_bytes(data, encoding, integer_ms=integer_ms),
+        srt.parse(composed, integer_ms=integer_ms),
+    )
+
+
+def test_parse_bytes_unknown_engine_raises():
+    with pytest.raises(ValueError):
+        list(srt.parse_bytes(b"", engine="nonexistent"))
+
+
+@given(
+    st.lists(subtitles()),
+    st.booleans(),
+    st.sampled_from([None, "\r\n"]),
+    st.sampled_from(["utf-8", "utf-16"]),
+)
+def test_compose_bytes_matches_compose(input_subs, reindex, eol, encoding):
+    composed = srt.compose(input_subs, reindex=reindex, eol=eol)
+    data = srt.compose_bytes(input_subs, encoding, reindex=reindex, eol=eol)
+    assert data == composed.encode(encoding)
+
+
+def to_millisecond_subtitle(sub):
+    return srt.MillisecondSubtitle(
+        index=sub.index,
+        start_ms=sub.start // timedelta(milliseconds=1),
+        end_ms=sub.end // timedelta(milliseconds=1),
+        content=sub.content,
+        proprietary=sub.proprietary,
+    )
+
+
+@given(st.lists(subtitles()))
+def test_parse_integer_ms(input_subs):
+    composed = srt.compose(input_subs, reindex=False)
+    ms_subs = list(srt.parse(composed, integer_ms=True))
+
+    assert all(isinstance(sub, srt.MillisecondSubtitle) for sub in ms_subs)
+    subs_eq(ms_subs, [to_millisecond_subtitle(sub) for sub in input_subs])
+    assert [(sub.start, sub.end) for sub in ms_subs] == [
+        (sub.start, sub.end) for sub in input_subs
+    ]
+    assert srt.compose(ms_subs, reindex=False) == composed
+    assert srt.compose(ms_subs) == srt.compose(input_subs)
+
+
+@given(st.lists(subtitles()), st.integers(min_value=1, max_value=64))
+def test_parse_stream_integer_ms(input_subs, chunk_size):
+    composed = srt.compose(input_subs, reindex=False)
+    streamed_subs = srt.parse_stream(
+        StringIO(composed), chunk_size=chunk_size, integer_ms=True
+    )
+    subs_eq(streamed_subs, srt.parse(composed, integer_ms=True))
+
+
+@given(subtitles(), timedeltas(min_value=-999, max_value=999))
+def test_millisecond_subtitle_set_timedelta(sub, delta):
+    ms_sub = to_millisecond_subtitle(sub)
+    ms_sub.start = delta
+    ms_sub.end = delta
+    sub.start = delta
+    sub.end = delta
+    assert ms_sub.start_ms == ms_sub.end_ms == delta // timedelta(milliseconds=1)
+    assert ms_sub.to_srt() == sub.to_srt()
+
+
+@given(subtitles(), subtitles())
+def test_millisecond_subtitle_ordering(sub_1, sub_2):
+    ms_sub_1 = to_millisecond_subtitle(sub_1)
+    ms_sub_2 = to_millisecond_subtitle(sub_2)
+    assert (ms_sub_1 < ms_sub_2) == (sub_1 < sub_2)
+    assert (ms_sub_1 < sub_2) == (sub_1 < sub_2)
+
+
+def test_millisecond_subtitle_slots():
+    ms_sub = srt.MillisecondSubtitle(1, 0, 1000, "x")
+    assert isinstance(ms_sub, srt.BaseSubtitle)
+    assert not isinstance(ms_sub, srt.Subtitle)
+    slots = {
+        slot
+        for cls in type(ms_sub).__mro__
+        for slot in cls.__dict__.get("__slots__", ())
+    }
+    assert "start" not in slots and "end" not in slots
+    assert srt.MillisecondSubtitle(**vars(ms_sub)) == ms_sub
+
+
+def test_base_subtitle_has_no_times():
+    sub = srt.BaseSubtitle(1, "x")
+    with pytest.raises(NotImplementedError):
+        sub.copy()
+    with pytest.raises(NotImplementedError):
+        sub.to_srt()
+
+
+@given(st.integers(min_value=-(10**12), max_value=10**12))
+def test_milliseconds_to_srt_timestamp_matches_timedelta(milliseconds):
+    delta = timedelta(milliseconds=milliseconds)
+    timestamp = srt.milliseconds_to_srt_timestamp(milliseconds)
+    assert timestamp == srt.timedelta_to_srt_timestamp(delta)
+    if milliseconds >= 0:
+        assert srt.srt_timestamp_to_milliseconds(timestamp) == milliseconds
+
+
+@given(timedeltas())
+def test_bad_timestamp_format_raises_milliseconds(ts):
+    ts = srt.timedelta_to_srt_timestamp(ts)
+    ts = ts.replace(":", "t", 1)
+    with pytest.raises(srt.TimestampParseError):
+        srt.srt_timestamp_to_milliseconds(ts)
+
+
+@given(st.integers(min_value=-(10**12), max_value=10**12), st.booleans())
+@example(-1, False)
+@example(100 * 60 * 60 * 1000, False)
+def test_milliseconds_to_srt_timestamp_matches_formatting(milliseconds, cached):
+    secs, msecs = divmod(milliseconds, 1000)
+    hrs, secs = divmod(secs, 3600)
+    mins, secs = divmod(secs, 60)
+    expected = "%02d:%02d:%02d,%03d" % (hrs, mins, secs, msecs)
+
+    cache_size = 16 if cached else 0
+    previous = srt.set_timestamp_cache_size(cache_size)
+    try:
+        assert srt.milliseconds_to_srt_timestamp(milliseconds) == expected
+        assert srt.milliseconds_to_srt_timestamp(milliseconds) == expected
+    finally:
+        assert srt.set_timestamp_cache_size(previous) == cache_size
+
+
+def test_milliseconds_to_srt_timestamp_truncates_floats():
+    assert srt.milliseconds_to_srt_timestamp(4984000.9) == "01:23:04,000"
+
+
+@given(
+    st.lists(st.integers(min_value=0, max_value=999), min_size=4, max_size=4),
+    st.lists(st.sampled_from(",.:，．。："), min_size=3, max_size=3),
+    st.booleans(),
+)
+def test_srt_timestamp_parsing_matches_regex(fields, delims, drop_msecs):
+    hrs, mins, secs, msecs = fields
+    timestamp = "%02d%s%02d%s%02d%s%03d" % (
+        hrs,
+        delims[0],
+        mins,
+        delims[1],
+        secs,
+        delims[2],
+        msecs,
+    )
+    if drop_msecs:
+        timestamp = timestamp[:-4]
+        msecs = 0
+    expected_ms = ((hrs * 60 + mins) * 60 + secs) * 1000 + msecs
+
+    assert srt.srt_timestamp_to_milliseconds(timestamp) == expected_ms
+    assert srt.srt_timestamp_to_timedelta(timestamp) == timedelta(
+        milliseconds=expected_ms
+    )
+
+
+@given(subtitles(), st.booleans())
+def test_subtitle_copy(sub, integer_ms):
+    if integer_ms:
+        sub = to_millisecond_subtitle(sub)
+
+    sub_copy = sub.copy()
+    assert sub_copy == sub
+    assert hash(sub_copy) == hash(sub)
+    assert type(sub_copy) is type(sub)
+    assert sub_copy is not sub
+
+    sub_copy.index += 1
+    assert sub_copy != sub
+
+
+@given(subtitles(), st.booleans())
+def test_subtitle_pickle(sub, integer_ms):
+    if integer_ms:
+        sub = to_millisecond_subtitle(sub)
+
+    unpickled_sub = pickle.loads(pickle.dumps(sub))
+    assert unpickled_sub == sub
+    assert type(unpickled_sub) is type(sub)
+
+
+@given(subtitles())
+def test_subtitle_has_no_instance_dict(sub):
+    with pytest.raises(AttributeError):
+        sub.not_a_field = 1
+
+    # vars() still works, but only gives a copy
+    sub_vars = vars(sub)
+    sub_vars["index"] += 1
+    assert sub.index != sub_vars["index"]
+
+
+@given(subtitles())
+def test_subtitle_and_millisecond_subtitle_not_equal(sub):
+    assert sub != to_millisecond_subtitle(sub)
+
+
+@given(
+    st.lists(subtitles(strict=False)),
+    st.sampled_from(["\n", "\r\n"]),
+    st.sampled_from(["fast", "regex"]),
+    st.booleans(),
+)
+def test_parse_lazy_matches_parse(input_subs, eol, engine, integer_ms):
+    composed = srt.compose(input_subs, reindex=False, strict=False, eol=eol)
+    lazy_subs = list(
+        srt.parse(composed, engine=engine, integer_ms=integer_ms, lazy=True)
+    )
+    subs_eq(lazy_subs, srt.parse(composed, engine=engine, integer_ms=integer_ms))
+    assert lazy_subs == list(srt.parse(composed, integer_ms=integer_ms))
+
+
+@given(
+    st.lists(subtitles(strict=False)),
+    st.sampled_from(["\n", "\r\n"]),
+    st.booleans(),
+    st.sampled_from([None, "\n", "\r\n", "\r"]),
+)
+@example([CONTENTLESS_SUB(content="a\nb")], "\r\n", True, "\n")
+@example([CONTENTLESS_SUB(content="a\n\nb")], "\n", True, "\n")
+def test_lazy_subtitle_to_srt(input_subs, source_eol, strict, eol):
+    composed = srt.compose(input_subs, reindex=False, strict=False, eol=source_eol)
+    for sub, lazy_sub in zip(srt.parse(composed), srt.parse(composed, lazy=True)):
+        assert lazy_sub.to_srt(strict=strict, eol=eol) == sub.to_srt(
+            strict=strict, eol=eol
+        )
+
+
+@pytest.mark.parametrize(
+    "integer_ms,lazy_type",
+    [(False, srt.LazySubtitle), (True, srt.LazyMillisecondSubtitle)],
+)
+def test_lazy_subtitle_set_content(integer_ms, lazy_type):
+    composed = "1\r\n00:00:01,000 --> 00:00:02,000\r\nfoo\r\n"
+    sub = next(srt.parse(StringIO(composed), integer_ms=integer_ms, lazy=True))
+    assert type(sub) is lazy_type
+
+    sub.content = "bar"
+    assert sub.to_srt(eol="\r\n") == composed.replace("foo", "bar") + "\r\n"
+
+    unpickled_sub = pickle.loads(pickle.dumps(sub))
+    assert unpickled_sub == sub
+    assert type(unpickled_sub) is lazy_type
+    assert sub.copy() == sub
+
+
+def table_subtitles(**kwargs):
+    # SubtitleTable stores indexes as signed 64-bit integers
+    return subtitles(**kwargs).filter(lambda sub: sub.index < 2**63)
+
+
+@given(st.lists(table_subtitles()), st.booleans())
+def test_subtitle_table_compose_matches_compose(input_subs, reindex):
+    table = srt.SubtitleTable.from_subtitles(input_subs)
+    composed = srt.compose(input_subs, reindex=reindex)
+    assert table.compose(reindex=reindex) == composed
+
+    out = StringIO()
+    table.compose_to(out, reindex=reindex, buffer_size=1)
+    assert out.getvalue() == composed
+
+
+@given(st.lists(table_subtitles()))
+def test_subtitle_table_from_srt(input_subs):
+    composed = srt.compose(input_subs, reindex=False)
+    table = srt.SubtitleTable.from_srt(composed)
+    assert len(table) == len(input_subs)
+    subs_eq(table, srt.parse(composed, integer_ms=True))
+    subs_eq(
+        srt.SubtitleTable.from_subtitles(srt.parse(composed, integer_ms=True)), table
+    )
+    assert table.compose(reindex=False) == composed
+
+
+@given(
+    st.lists(table_subtitles(strict=False)),
+    st.sampled_from(["\n", "\r\n"]),
+    st.sampled_from(["utf-8", "ascii", "utf-16"]),
+)
+def test_subtitle_table_from_bytes(input_subs, eol, encoding):
+    if encoding == "ascii":
+        for subtitle in input_subs:
+            subtitle.content = subtitle.content.encode("ascii", "replace").decode()
+            subtitle.proprietary = ""
+
+    composed = srt.compose(input_subs, reindex=False, strict=False, eol=eol)
+    table = srt.SubtitleTable.from_bytes(composed.encode(encoding), encoding)
+    subs_eq(table, srt.SubtitleTable.from_srt(composed))
+
+
+@given(
+    st.lists(table_subtitles(strict=False)),
+    st.booleans(),
+    st.booleans(),
+    st.sampled_from([None, "\r\n"]),
+    st.sampled_from(["utf-8", "utf-16"]),
+)
+def test_subtitle_table_compose_bytes(input_subs, reindex, strict, eol, encoding):
+    composed = srt.compose(input_subs, reindex=False, strict=False)
+    table = srt.SubtitleTable.from_bytes(composed.encode("utf-8"))
+    expected = srt.SubtitleTable.from_srt(composed).compose(
+        reindex=reindex, strict=strict, eol=eol
+    )
+
+    assert table.compose(reindex=reindex, strict=strict, eol=eol) == expected
+    data = table.compose_bytes(encoding, reindex=reindex, strict=strict, eol=eol)
+    assert data == expected.encode(encoding)
+
+    out = BytesIO()
+    table.compose_to(
+        out, reindex=reindex, strict=strict, eol=eol, buffer_size=1, encoding=encoding
+    )
+    assert out.getvalue() == expected.encode(encoding)
+
+
+def test_subtitle_table_from_bytes_unusual_content():
+    # Only ASCII whitespace is stripped from undecoded content, but other
+    # whitespace should still make a subtitle count as having no content.
+    # Blank lines should be removed from the content like usual.
+    composed = (
+        "1\n00:00:01,000 --> 00:00:02,000\n\u3000\n\n"
+        "2\n00:00:03,000 --> 00:00:04,000\n \u00e9\n\n"
+        "3\n00:00:05,000 --> 00:00:06,000\nblank\n\nline\n\n"
+    )
+    table = srt.SubtitleTable.from_bytes(composed.encode("utf-8"))
+    assert table.compose_bytes() == srt.compose(srt.parse(composed)).encode("utf-8")
+
+
+def test_subtitle_table_from_bytes_append_and_filter():
+    table = srt.SubtitleTable.from_bytes(b"1\n00:00:01,000 --> 00:00:02,000\nx\n\n")
+    table.append(2, 3000, 4000, "caf\u00e9", "X:1")
+    assert table[1].content == "caf\u00e9"
+
+    filtered = table.filter([False, True])
+    assert filtered.compose_bytes() == (
+        b"1\n00:00:03,000 --> 00:00:04,000 X:1\ncaf\xc3\xa9\n\n"
+    )
+
+
+def test_subtitle_table_from_bytes_unknown_engine_raises():
+    with pytest.raises(ValueError):
+        srt.SubtitleTable.from_bytes(b"", engine="nonexistent")
+
+
+@given(
+    st.lists(table_subtitles(strict=False)),
+    st.integers(min_value=-(10**9), max_value=10**9),
+)
+def test_subtitle_table_shift(input_subs, milliseconds):
+    table = srt.SubtitleTable.from_subtitles(input_subs)
+    table.shift(milliseconds)
+
+    for sub in input_subs:
+        sub.start += timedelta(milliseconds=milliseconds)
+        sub.end += timedelta(milliseconds=milliseconds)
+
+    assert table.compose(strict=False) == srt.compose(input_subs, strict=False)
+
+
+@given(st.lists(table_subtitles()), st.floats(min_value=0, max_value=10))
+def test_subtitle_table_scale(input_subs, factor):
+    table = srt.SubtitleTable.from_subtitles(input_subs)
+    table.scale(factor)
+
+    for sub, scaled_sub in zip(input_subs, table):
+        start_ms = sub.start // timedelta(milliseconds=1)
+        end_ms = sub.end // timedelta(milliseconds=1)
+        assert scaled_sub.start_ms == round(start_ms * factor)
+        assert scaled_sub.end_ms == round(end_ms * factor)
+
+
+@given(st.lists(table_subtitles()))
+def test_subtitle_table_sort(input_subs):
+    table = srt.SubtitleTable.from_subtitles(input_subs)
+    table.sort()
+    subs_eq(table, srt.SubtitleTable.from_subtitles(sorted(input_subs)))
+
+
+@given(st.lists(table_subtitles()), st.lists(st.booleans()))
+def test_subtitle_table_filter(input_subs, keep):
+    table = srt.SubtitleTable.from_subtitles(input_subs)
+    filtered = table.filter(keep)
+    expected = [sub for sub, kept in zip(input_subs, keep) if kept]
+    subs_eq(filtered, srt.SubtitleTable.from_subtitles(expected))
+
+    # The original table should be untouched
+    assert len(table) == len(input_subs)